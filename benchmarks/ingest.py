@@ -0,0 +1,67 @@
+"""
+Mede a vazão do serviço de ingestão (skillStack.ingest) com dados sintéticos.
+
+Envia as redações em ordem de envio como linhas NDJSON, intercaladas com
+consultas greater(n), e informa redações/s e a latência das consultas. O cache
+menor que o número de usuários exercita o descarte e a releitura do SQLite.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.ingest --rows 200000 --users 50000 --capacity 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from skillStack.ingest import IngestService
+from skillStack.stack_store import SqliteStackStore
+from utils.synthetic_data import synthetic_essays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--capacity", type=int, default=5_000, help="Pilhas mantidas em memória")
+    parser.add_argument("--query-every", type=int, default=10, help="Uma consulta a cada N redações")
+    parser.add_argument("--top", type=int, default=3, help="n das consultas greater(n)")
+    args = parser.parse_args()
+
+    df = synthetic_essays(args.rows, essays_per_user=args.rows / args.users).sort_values("dat_envio", kind="stable")
+    lines = [json.dumps(record).encode() for record in df.to_dict("records")]
+    users = df["cod_usuario"].tolist()
+    queries = [json.dumps({"greater": args.top, "cod_usuario": user}).encode() for user in users]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store = SqliteStackStore(os.path.join(workdir, "skill_stack.db"))
+        service = IngestService(store, capacity=args.capacity)
+        latencies = []
+        start = time.perf_counter()
+        for i, line in enumerate(lines):
+            service.handle_line(line)
+            if i % args.query_every == 0:
+                query_start = time.perf_counter()
+                service.handle_line(queries[i])
+                latencies.append(time.perf_counter() - query_start)
+        elapsed = time.perf_counter() - start
+
+        flush_start = time.perf_counter()
+        service.close()
+        flush = time.perf_counter() - flush_start
+        store.close()
+
+    latencies = np.array(latencies) * 1e6
+    print(f"{args.rows} redações, {args.users} usuários, cache de {args.capacity} pilhas")
+    print(f"ingestão: {elapsed:.2f}s  {args.rows / elapsed:,.0f} redações/s (com {len(latencies)} consultas)")
+    print(
+        f"greater({args.top}): p50 {np.percentile(latencies, 50):.0f} µs  "
+        f"p99 {np.percentile(latencies, 99):.0f} µs  máx {latencies.max():.0f} µs"
+    )
+    print(f"gravação final: {flush * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Mede a escala de simulate_stack(workers=...) com dados sintéticos.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.parallel_scaling --rows 1000000 --max-workers 8
+"""
+import argparse
+import os
+import time
+
+from skillStack.simulate_skillstack import simulate_stack
+from utils.synthetic_data import synthetic_essays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--sequence", action="store_true", help="Uma pilha por cod_usuario")
+    args = parser.parse_args()
+
+    df = synthetic_essays(args.rows, essays_per_user=args.rows / args.users)
+    kwargs = {"sequence_method": args.sequence, "group_by": "cod_usuario" if args.sequence else None}
+
+    workers = [1]
+    while workers[-1] * 2 <= args.max_workers:
+        workers.append(workers[-1] * 2)
+
+    print(f"{args.rows} linhas, {os.cpu_count()} CPUs")
+    baseline = None
+    for n in workers:
+        start = time.perf_counter()
+        simulate_stack(df, output_type="df", workers=n, **kwargs)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"workers={n}: {elapsed:.2f}s  {args.rows / elapsed:,.0f} linhas/s  speedup {baseline / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Benchmarks dos caminhos críticos da simulação com dados sintéticos.
+
+Mede _load_rules, _check_rules, SkillStack.update, simulate_stack em cada
+output_type e count_top_skills; informa linhas/s e pico de memória, salva os
+resultados como baseline e compara com um baseline anterior. As simulações
+avaliam as regras a cada repetição (sem o HIT_CACHE); o caminho com as máscaras
+em cache é medido à parte em simulate_stack_stacks_cached.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.run --rows 100000 --save main
+    python -m benchmarks.run --rows 100000 --compare main
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from skillStack.hit_cache import HIT_CACHE
+from skillStack.ruleset import invalidate_ruleset
+from skillStack.simulate_skillstack import _check_rules, _load_rules, simulate_stack
+from skillStack.skill_stack import SkillStack
+from utils.synthetic_data import synthetic_essays
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+OUTPUT_TYPES = ["stacks", "df", "print", "csv", "xlsx", "plot", "anim"]
+
+
+def build_benchmarks(df, args, workdir):
+    # nome -> (função, linhas processadas por chamada)
+    sample = df.head(args.row_sample)
+    rules = _load_rules()
+    variables = [row._asdict() for row in sample.itertuples(index=False)]
+    weighted = [_check_rules(v, rules) for v in variables]
+
+    def load_rules_cold():
+        invalidate_ruleset()
+        _load_rules()
+
+    def check_rules():
+        for v in variables:
+            _check_rules(v, rules)
+
+    def skill_stack_update():
+        stack = SkillStack()
+        for weights, decays in weighted:
+            stack.update(weights, decays)
+
+    benchmarks = {
+        "load_rules_cold": (load_rules_cold, 0),
+        "load_rules_warm": (_load_rules, 0),
+        "check_rules": (check_rules, len(variables)),
+        "skill_stack_update": (skill_stack_update, len(weighted)),
+    }
+
+    for output_type in OUTPUT_TYPES:
+        if output_type == "xlsx" and not _has_module("openpyxl"):
+            continue
+        # Animação e impressão crescem com o número de linhas; usam amostras
+        if output_type == "anim":
+            data = df.head(args.anim_rows)
+        elif output_type in ("print", "xlsx"):
+            data = sample
+        else:
+            data = df
+        benchmarks[f"simulate_stack_{output_type}"] = (
+            _simulate(data, output_type, os.path.join(workdir, "output")),
+            len(data),
+        )
+    benchmarks["simulate_stack_sequence"] = (
+        _simulate(df, "stacks", None, sequence_method=True, group_by="cod_usuario"),
+        len(df),
+    )
+    # Máscaras reaproveitadas do HIT_CACHE (a primeira repetição as calcula)
+    benchmarks["simulate_stack_stacks_cached"] = (
+        _simulate(df, "stacks", None, use_hit_cache=True),
+        len(df),
+    )
+
+    if _has_module("streamlit"):
+        from pages.common_skills import count_top_skills
+
+        def top_skills():
+            # count_top_skills usa o HIT_CACHE; limpo para medir a avaliação das regras
+            HIT_CACHE.clear()
+            count_top_skills(df, use_cache=False)
+
+        benchmarks["count_top_skills"] = (top_skills, len(df))
+
+    return benchmarks
+
+
+def measure(func, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = min(timings)
+    return {
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if rows and seconds else None,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--essays-per-user", type=float, default=5)
+    parser.add_argument("--hit-rate", type=float, default=0.2)
+    parser.add_argument("--row-sample", type=int, default=2_000, help="Linhas dos benchmarks por linha (_check_rules, print...)")
+    parser.add_argument("--anim-rows", type=int, default=100, help="Linhas do benchmark de output_type='anim'")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="Executa apenas estes benchmarks")
+    parser.add_argument("--save", metavar="NOME", help="Salva os resultados em benchmarks/baselines/NOME.json")
+    parser.add_argument("--compare", metavar="NOME", help="Compara com benchmarks/baselines/NOME.json")
+    args = parser.parse_args()
+
+    df = synthetic_essays(args.rows, args.essays_per_user, args.hit_rate)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, (func, rows) in build_benchmarks(df, args, workdir).items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = measure(func, rows, args.repeat)
+            _print_result(name, results[name])
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "rows": args.rows,
+        "essays_per_user": args.essays_per_user,
+        "hit_rate": args.hit_rate,
+        "results": results,
+    }
+
+    if args.compare:
+        with open(os.path.join(BASELINES_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        print(f"\nComparação com {args.compare} ({baseline['commit']}):")
+        for name, result in results.items():
+            if name in baseline["results"]:
+                ratio = result["seconds"] / baseline["results"][name]["seconds"]
+                print(f"  {name:32s} {ratio:6.2f}x o tempo do baseline")
+
+    if args.save:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(os.path.join(BASELINES_DIR, f"{args.save}.json"), "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\nBaseline salvo em benchmarks/baselines/{args.save}.json")
+
+
+def _simulate(df, output_type, output_path, use_hit_cache=False, **kwargs):
+    # Sem o HIT_CACHE, cada repetição avalia as regras (o mínimo não mede o cache)
+    kwargs["use_hit_cache"] = use_hit_cache
+
+    def run():
+        # Desvia os prints de simulate_stack
+        with contextlib.redirect_stdout(io.StringIO()):
+            simulate_stack(df, output_type=output_type, output_path=output_path, **kwargs)
+
+    return run
+
+
+def _print_result(name, result):
+    rate = f"{result['rows_per_sec']:>14,.0f} linhas/s" if result["rows_per_sec"] else " " * 22
+    print(f"{name:32s} {result['seconds'] * 1000:10.1f} ms {rate} {result['peak_mb']:9.1f} MB")
+
+
+def _has_module(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    main()
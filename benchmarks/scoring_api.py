@@ -0,0 +1,108 @@
+"""
+Mede vazão e latência da API de pontuação (skillStack.scoring_api) com dados
+sintéticos, para ajustar --max-batch-rows e --max-delay-ms.
+
+Sobe a API neste processo e dispara --clients clientes simultâneos, cada um
+enviando requisições de --rows-per-request linhas numa conexão keep-alive.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.scoring_api --clients 32 --rows-per-request 20 --max-delay-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from skillStack.scoring_api import MicroBatcher, ScoringServer
+from utils.synthetic_data import synthetic_essays
+
+
+async def client(port, bodies, latencies, statuses):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for body in bodies:
+        start = time.perf_counter()
+        writer.write(
+            f"POST /score HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) != b"\r\n":
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        statuses.append(status)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(args):
+    df = synthetic_essays(args.clients * args.requests * args.rows_per_request)
+    records = df.to_dict("records")
+    bodies = [
+        json.dumps({"rows": records[i:i + args.rows_per_request], "output": args.output, "k": 3}).encode()
+        for i in range(0, len(records), args.rows_per_request)
+    ]
+
+    batcher = MicroBatcher(
+        workers=args.workers,
+        max_batch_rows=args.max_batch_rows,
+        max_delay=args.max_delay_ms / 1000,
+        max_pending_rows=args.max_pending_rows,
+    )
+    server = asyncio.create_task(ScoringServer(batcher).serve("127.0.0.1", args.port))
+    await asyncio.sleep(0.2)
+
+    # Aquecimento: cria o pool de processos e compila as regras nos workers
+    await client(args.port, bodies[:1], [], [])
+
+    latencies, statuses = [], []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(args.port, bodies[c * args.requests:(c + 1) * args.requests], latencies, statuses)
+            for c in range(args.clients)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    batches = batcher.batches - 1
+    server.cancel()
+    try:
+        await server
+    except asyncio.CancelledError:
+        pass
+
+    latencies = np.array(latencies) * 1000
+    ok = sum(status == 200 for status in statuses)
+    rows = ok * args.rows_per_request
+    print(
+        f"{args.clients} clientes x {args.requests} requisições de {args.rows_per_request} linhas, "
+        f"{args.workers} workers, lote <= {args.max_batch_rows} linhas / {args.max_delay_ms} ms"
+    )
+    print(f"vazão: {rows / elapsed:,.0f} linhas/s  {len(statuses) / elapsed:,.0f} requisições/s  ({batches} lotes)")
+    print(f"latência: p50 {np.percentile(latencies, 50):.1f} ms  p99 {np.percentile(latencies, 99):.1f} ms")
+    if ok < len(statuses):
+        print(f"recusadas (503): {len(statuses) - ok}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="Requisições por cliente")
+    parser.add_argument("--rows-per-request", type=int, default=20)
+    parser.add_argument("--output", choices=("stacks", "top"), default="top")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-batch-rows", type=int, default=4096)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    parser.add_argument("--max-pending-rows", type=int, default=100_000)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
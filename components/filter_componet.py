@@ -2,20 +2,16 @@ import streamlit as st
 import pandas as pd
 import math
 
+from utils.column_stats import column_catalog
+from utils.filter_index import filter_index
+
 def apply_filters(df, filters):
-    # Filtrar DataFrame
-    filtered_df = df.copy()
-    for col, criteria in filters.items():
-        if pd.api.types.is_numeric_dtype(df[col]):
-            if isinstance(criteria, tuple):
-                filtered_df = filtered_df[
-                    (filtered_df[col] >= criteria[0]) & (filtered_df[col] <= criteria[1])
-                ]
-            else:
-                filtered_df = filtered_df[filtered_df[col].isin(criteria)]
-        else:
-            filtered_df = filtered_df[filtered_df[col].isin(criteria)]
-    return filtered_df
+    # Filtrar DataFrame pelos índices das colunas (montados uma vez por DataFrame)
+    mask = filter_index(df).mask(filters)
+    if mask is None:
+        # Nenhum filtro restringe as linhas: devolve o próprio DataFrame, sem cópia
+        return df
+    return df[mask]
 
 def toggle_button(col):
     # Exibe o botão redondo para alternar o tipo de filtro
@@ -37,18 +33,22 @@ def toggle_button(col):
     return filter_type
 
 def filter_component(filter_type, df, col, filters):
+    # Estatísticas da coluna calculadas uma vez por conjunto de dados (sem varrer o DataFrame)
+    stats = column_catalog(df)[col]
+    unique_values = stats.values
+
     # Definir o filtro baseado no tipo de filtro selecionado
-    if pd.api.types.is_numeric_dtype(df[col]):
+    if stats.numeric:
         if filter_type == "Intervalo Numérico":
-            if pd.api.types.is_integer_dtype(df[col]):
+            if stats.integer:
                 # int 
-                min_value = int(df[col].min())
-                max_value = math.ceil(df[col].max())
+                min_value = int(stats.min)
+                max_value = math.ceil(stats.max)
                 step = 1 
             else: 
                 # float
-                min_value = float(df[col].min())
-                max_value = float(df[col].max())
+                min_value = float(stats.min)
+                max_value = float(stats.max)
                 step = 0.01
             range_selected = st.sidebar.slider(
                 f"Filtro de intervalo para {col}",
@@ -60,7 +60,6 @@ def filter_component(filter_type, df, col, filters):
             filters[col] = range_selected
         else:
             # Caso o filtro seja para valores específicos, mostrar um multiselect
-            unique_values = df[col].unique()
             selected_values = st.sidebar.multiselect(
                 f"Filtro para {col}",
                 options=unique_values,
@@ -71,7 +70,6 @@ def filter_component(filter_type, df, col, filters):
     else:
         if filter_type == "Intervalo Numérico":
             # Para colunas não numéricas, desabilitar o intervalo e usar multiselect
-            unique_values = df[col].unique()
             selected_values = st.sidebar.multiselect(
                 f"Filtro para {col}",
                 options=unique_values,
@@ -79,7 +77,6 @@ def filter_component(filter_type, df, col, filters):
             )
             filters[col] = selected_values if selected_values else unique_values
         else:
-            unique_values = df[col].unique()
             selected_values = st.sidebar.multiselect(
                 f"Filtro para {col}",
                 options=unique_values,
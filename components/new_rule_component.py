@@ -1,57 +1,64 @@
 import streamlit as st
-import pandas as pd
-import json
+
+from skillStack.rule_store import RuleStore
+from skillStack.rule_engine import UnsupportedRule, validate_rule
+from utils.column_stats import column_catalog
 
 RULES_FILE = "rules.json"
 
+def _literal(value):
+    # Constante na linguagem de regras (escalares numpy viram tipos do Python)
+    if isinstance(value, (list, tuple)):
+        return repr([_literal_value(v) for v in value])
+    return repr(_literal_value(value))
+
+def _literal_value(value):
+    return value.item() if hasattr(value, "item") else value
+
 def write_rule(filters, rule_name, rule_weight, rule_decay_rate, df):
-    # Gerar a regra em formato de string
+    # Gerar a regra na linguagem de regras (ex.: "(col >= 1) & (col2 in ['a'])")
     rule_parts = []
+    catalog = column_catalog(df)
 
     for col in filters:
-        if pd.api.types.is_numeric_dtype(df[col]):
+        if catalog[col].numeric:
             # Obtém os limites do filtro
             min_val, max_val = filters[col]
 
-            # Obtém os limites da variável no DataFrame
-            col_min, col_max = df[col].min(), df[col].max()
+            # Obtém os limites da variável no catálogo do DataFrame
+            col_min, col_max = catalog[col].min, catalog[col].max
 
             # Constrói as condições com base nos limites
             conditions = []
             if min_val > col_min:  # Inclui condição >= apenas se min_val não for o valor mínimo
-                conditions.append(f"(vars.get('{col}') >= {min_val})")
+                conditions.append(f"({col} >= {_literal(min_val)})")
             if max_val < col_max:  # Inclui condição <= apenas se max_val não for o valor máximo
-                conditions.append(f"(vars.get('{col}') <= {max_val})")
+                conditions.append(f"({col} <= {_literal(max_val)})")
 
             # Adiciona a condição da coluna à regra final
             if conditions:
                 rule_parts.append(" & ".join(conditions))
         else:
             # Condição para colunas não numéricas
-            rule_parts.append(f"vars.get('{col}') in {filters[col]}")
+            rule_parts.append(f"({col} in {_literal(list(filters[col]))})")
 
     # Gerar a regra completa
     rule_string = " & ".join(rule_parts)
 
+    # Valida a sintaxe e as colunas antes de salvar (lança UnsupportedRule)
+    validate_rule(rule_string, df.columns)
+
     # Criar o dicionário da nova regra
     new_rule = {
         "habilidade": rule_name,
-        "regra": f"lambda vars: {rule_string}",
+        "regra": rule_string,
         "peso": int(rule_weight),
         "decaimento": float(rule_decay_rate)
     }
 
-    # Salvar a regra no arquivo JSON
-    try:
-        with open(RULES_FILE, "r") as f:
-            rules = json.load(f)
-    except FileNotFoundError:
-        rules = []
-
-    rules.append(new_rule)
-
-    with open(RULES_FILE, "w") as f:
-        json.dump(rules, f, indent=4)
+    # Salvar a regra no arquivo JSON (leitura e gravação sob o lock do store,
+    # para não perder regras adicionadas ao mesmo tempo por outra pessoa)
+    RuleStore(RULES_FILE).update(lambda rules: rules + [new_rule])
 
 def new_rule_component(filters, df):
     # Adicionar nova regra
@@ -63,5 +70,8 @@ def new_rule_component(filters, df):
         if not rule_name:
             st.error("Por favor, forneça um nome para a regra.")
         else:
-            write_rule(filters, rule_name, rule_weight, rule_decay_rate, df)
-            st.success("Regra adicionada com sucesso!")
\ No newline at end of file
+            try:
+                write_rule(filters, rule_name, rule_weight, rule_decay_rate, df)
+                st.success("Regra adicionada com sucesso!")
+            except UnsupportedRule as e:
+                st.error(f"Regra inválida: {e}")
\ No newline at end of file
@@ -0,0 +1,31 @@
+import streamlit as st
+import pandas as pd
+
+def profile_component(profile):
+    # Mostra o perfil de uma simulação (fases e regras) com exportação em JSON
+    report = profile.to_dict()
+    with st.expander(f"Perfil da simulação ({report['total']:.3f} s)"):
+        st.write("#### Tempo por fase")
+        phases = pd.DataFrame(list(report["fases"].items()), columns=["Fase", "Segundos"])
+        st.dataframe(phases, hide_index=True)
+
+        st.write("#### Regras (mais lentas primeiro)")
+        rules = pd.DataFrame(report["regras"])
+        if not rules.empty:
+            rules = rules.rename(columns={
+                "regra": "Regra",
+                "habilidade": "Habilidade",
+                "modo": "Avaliação",
+                "segundos": "Segundos",
+                "acertos": "Acertos",
+                "excecoes": "Exceções",
+                "fonte": "Expressão",
+            })
+        st.dataframe(rules, hide_index=True)
+
+        st.download_button(
+            "Exportar perfil (JSON)",
+            data=profile.to_json(indent=4),
+            file_name="perfil_simulacao.json",
+            mime="application/json",
+        )
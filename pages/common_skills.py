@@ -2,43 +2,33 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from collections import Counter
-from utils.load_data import load_data
-from skillStack.simulate_skillstack import simulate_stack
+from utils.load_data import load_data, required_columns, describe_load, sample_data
+from skillStack.simulate_skillstack import simulate_top_skills
+from skillStack.profiling import SimulationProfile
+from skillStack.result_cache import RESULT_CACHE, simulation_key
 
 from components.new_rule_component import new_rule_component
 from components.filter_componet import filter_component, apply_filters, toggle_button
+from components.profile_component import profile_component
 
-def count_top_skills(df):
-    # Supondo que stack_result tenha sido obtido corretamente de simulate_stack
-    stack_result = simulate_stack(df, sequence_method=True, output_type="stacks")
-
-    # Verificar se stack_result é uma lista válida e não vazia
-    if not isinstance(stack_result, list) or not stack_result:
-        st.error("Erro: stack_result não é uma lista válida.")
+def count_top_skills(df, profile=None, source=None, use_cache=True):
+    # Conta direto da matriz de pilhas (argmax por linha), sem montar um dict por redação
+    if df.empty:
+        st.error("Erro: nenhuma redação para calcular as pilhas.")
         return {}
 
-    # Inicializar o contador para as habilidades que aparecem como top 1
-    top_skills_counter = Counter()
-
-    # Iterar sobre todas as redações
-    for item in stack_result:
-        # Verificar se o item contém a chave "stack_result" e se ela é um dicionário
-        if isinstance(item.get("stack_result"), dict):
-            # Obter o dicionário de habilidades
-            skills_dict = item["stack_result"]
-
-            # Ordenar as habilidades pelo peso (valor) de forma decrescente
-            sorted_stack = sorted(skills_dict.items(), key=lambda x: x[1], reverse=True)
-
-            # Pegar a habilidade top 1 (a com maior peso)
-            top_skill = sorted_stack[0][0]  # nome da habilidade
-
-            # Atualizar o contador para essa habilidade
-            top_skills_counter[top_skill] += 1
+    if use_cache and profile is None:
+        # Reaproveitado enquanto dados, filtros e regras não mudarem
+        top_skills = RESULT_CACHE.get_or_compute(
+            simulation_key(df, "top_skills", sequence_method=True, source=source, k=1),
+            lambda: simulate_top_skills(df, k=1, sequence_method=True),
+        )
+    else:
+        top_skills = simulate_top_skills(df, k=1, sequence_method=True, profile=profile)
 
     # Retornar o contador de habilidades que apareceram como top 1
-    return top_skills_counter
-    
+    return Counter(top_skills.to_dict())
+
 def plot_top_skills(top_skills):
     """
     Cria um gráfico de barras para visualizar as habilidades que ficaram em top 1.
@@ -59,7 +49,7 @@ def plot_top_skills(top_skills):
     )
     return fig
 
-def result_container(filtered_df, df):
+def result_container(filtered_df, df, profile=None):
     # Mostrar resultados gerais
     st.write("### Linhas Correspondentes")
     num_filtered = len(filtered_df)
@@ -72,13 +62,24 @@ def result_container(filtered_df, df):
 
     # Contar habilidades no top 1 e exibir gráfico
     st.write("### Análise de Habilidades no Top 1")
-    top_skills = count_top_skills(filtered_df)
+    top_skills = count_top_skills(filtered_df, profile, source=df)
     if top_skills:
         fig = plot_top_skills(top_skills)
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.write("Nenhuma habilidade foi identificada como top 1 nas pilhas calculadas.")
 
+    # Contagem do top 1 separada pelos valores de uma coluna
+    breakdown_col = st.selectbox("Detalhar o top 1 por coluna:", options=["(nenhuma)"] + list(filtered_df.columns))
+    if top_skills and breakdown_col != "(nenhuma)":
+        breakdown = RESULT_CACHE.get_or_compute(
+            simulation_key(filtered_df, "top_skills", sequence_method=True, source=df, k=1, by=breakdown_col),
+            lambda: simulate_top_skills(filtered_df, k=1, sequence_method=True, by=breakdown_col),
+        )
+        st.dataframe(breakdown)
+    if profile is not None:
+        profile_component(profile)
+
 
 def page_commonSkills():
     st.title("Análise de Habilidades no Top 1")
@@ -94,9 +95,18 @@ def page_commonSkills():
     )
 
     # Carregar DataFrame
-    df = load_data(method='csv', path='data/conteudo_adaptativoc2_dados_selecionados.csv')
+    only_rule_columns = st.sidebar.checkbox("Carregar apenas colunas usadas nas regras", value=True)
+    df = load_data(
+        method='csv',
+        path='data/conteudo_adaptativoc2_dados_selecionados.csv',
+        columns=required_columns() if only_rule_columns else None,
+    )
+    st.sidebar.caption(describe_load(df))
+    profile = SimulationProfile() if st.sidebar.checkbox("Perfilar simulação", value=False) else None
     try:
-        df = df.sample(sample_size)
+        # Amostra fixa e reaproveitada entre reruns: outros widgets não sorteiam novas
+        # redações nem refazem índices, catálogos e chaves de cache da amostra
+        df = sample_data(df, sample_size, random_state=0)
     except ValueError:
         st.warning("Número de amostras excede o tamanho do dataset.")
 
@@ -122,7 +132,7 @@ def page_commonSkills():
 
     filtered_df = apply_filters(df, filters)
 
-    result_container(filtered_df, df)
+    result_container(filtered_df, df, profile)
     new_rule_component(filters, df)
 
 if __name__ == '__main__':
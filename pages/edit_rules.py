@@ -1,20 +1,43 @@
 import streamlit as st
-import json
-import os
+
+from skillStack.rule_engine import UnsupportedRule, migrate_rule
+from skillStack.rule_store import RuleStore, StaleRulesError
 
 RULES_FILE = "rules.json"
 
 def load_rules():
-    """Carrega as regras do arquivo JSON."""
-    if os.path.exists(RULES_FILE):
-        with open(RULES_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def save_rules(rules):
-    """Salva as regras no arquivo JSON."""
-    with open(RULES_FILE, "w") as f:
-        json.dump(rules, f, indent=4)
+    """Carrega as regras do arquivo JSON e a versão correspondente."""
+    return RuleStore(RULES_FILE).read()
+
+def save_rules(rules, expected_version=None):
+    """
+    Salva as regras no arquivo JSON, na linguagem de regras, e retorna a nova
+    versão. Com expected_version, recusa a gravação se outra pessoa salvou antes.
+    """
+    # Valida todas as regras antes de gravar (regras antigas são convertidas)
+    for i, rule in enumerate(rules):
+        try:
+            rule["regra"] = migrate_rule(rule["regra"])
+        except UnsupportedRule as e:
+            raise UnsupportedRule(f"Regra {i + 1}: {e}")
+    return RuleStore(RULES_FILE).write(rules, expected_version)
+
+def try_save_rules(rules):
+    """Salva as regras, mostrando o erro se alguma for inválida ou se a versão carregada estiver desatualizada."""
+    try:
+        st.session_state.rules_version = save_rules(rules, st.session_state.get("rules_version"))
+        return True
+    except UnsupportedRule as e:
+        st.error(f"Regras não salvas. {e}")
+    except StaleRulesError as e:
+        st.error(f"Regras não salvas. {e} Recarregue as regras antes de salvar.")
+    return False
+
+def reload_rules():
+    """Descarta as edições da sessão e passa a usar a versão atual do arquivo."""
+    for key in list(st.session_state.keys()):
+        if key == "rules_version" or key.split("_")[0] in ("habilidade", "regra", "peso", "decay"):
+            del st.session_state[key]
 
 def screen_editRules():
     st.title("Editor de Regras")
@@ -27,8 +50,14 @@ def screen_editRules():
         st.session_state.rule_decay = 0.5
         st.session_state.rerun = False
 
-    # Carregar regras do arquivo
-    rules = load_rules()
+    # Carregar regras do arquivo (a versão da primeira leitura é a base das gravações)
+    rules, version = load_rules()
+    st.session_state.setdefault("rules_version", version)
+    if st.session_state.rules_version != version:
+        st.warning("As regras foram alteradas por outra pessoa desde que esta página foi aberta.")
+        if st.button("Recarregar regras"):
+            reload_rules()
+            st.rerun()
 
     if not rules:
         st.warning("Nenhuma regra encontrada! Você pode criar uma nova regra abaixo.")
@@ -52,14 +81,14 @@ def screen_editRules():
         # Botão para deletar a regra
         if st.button(f"Deletar Regra {i + 1}"):
             rules.pop(i)
-            save_rules(rules)
-            st.success(f"Regra {i + 1} deletada com sucesso!")
-            st.rerun()  # Recarregar a página
+            if try_save_rules(rules):
+                st.success(f"Regra {i + 1} deletada com sucesso!")
+                st.rerun()  # Recarregar a página
 
     # Salvar todas as alterações
     if st.button("Salvar Alterações"):
-        save_rules(rules)
-        st.success("Regras salvas com sucesso!")
+        if try_save_rules(rules):
+            st.success("Regras salvas com sucesso!")
 
     st.write("---")
     st.write("### Criar Nova Regra")
@@ -81,15 +110,15 @@ def screen_editRules():
                 "decaimento": float(new_decaimento)
             }
             rules.append(new_rule)
-            save_rules(rules)
-            st.success("Nova regra adicionada com sucesso!")
-
-            del st.session_state.rule_name
-            del st.session_state.rule_text
-            del st.session_state.rule_weight
-            del st.session_state.rule_decay
-            st.session_state.rerun = True
-            st.rerun()  # Recarregar a página
+            if try_save_rules(rules):
+                st.success("Nova regra adicionada com sucesso!")
+
+                del st.session_state.rule_name
+                del st.session_state.rule_text
+                del st.session_state.rule_weight
+                del st.session_state.rule_decay
+                st.session_state.rerun = True
+                st.rerun()  # Recarregar a página
 
 if __name__ == "__main__":
     screen_editRules()
@@ -1,24 +1,51 @@
+import math
+
 import streamlit as st
 
-from utils.load_data import load_data
-from skillStack.simulate_skillstack import simulate_stack
+from utils.load_data import load_data, required_columns, describe_load, derived_frame, sample_data
+from skillStack.sequence_engine import simulate_sequences
+from skillStack.simulate_skillstack import animate_trajectory
+from skillStack.animation import DEFAULT_MAX_FRAMES
+from skillStack.result_cache import RESULT_CACHE, simulation_key
 
 from components.new_rule_component import new_rule_component
 from components.filter_componet import filter_component, apply_filters, toggle_button
 
+USERS_PER_PAGE = 10
+
 # Novo contêiner para exibir os resultados das sequências
-def sequence_result_container(df, filters):
+def sequence_result_container(df, source=None):
     st.write("### Resultados por Sequência")
-    sequences = df.groupby("cod_usuario")
-    for user_id, group in sequences:
-        # Ordenar pelo dat_envio
-        group_sorted = group.sort_values(by="dat_envio")
-        
-        # Passar cada sequência para simulate_stack
-        fig = simulate_stack(df, sequence_method=True, output_type="anim")
-        
+
+    # Uma única simulação para todos os usuários, ordenada por dat_envio; reaproveitada
+    # entre reruns (ex.: troca de página de usuários) enquanto dados e regras não mudarem
+    trajectories = RESULT_CACHE.get_or_compute(
+        simulation_key(df, "trajectories", sequence_method=True, source=source, by="cod_usuario", order="dat_envio"),
+        lambda: simulate_sequences(df, by="cod_usuario", order="dat_envio"),
+    )
+    if not trajectories:
+        st.write("Nenhuma sequência encontrada nos dados filtrados.")
+        return
+
+    # Os gráficos são criados apenas para os usuários da página atual
+    users = list(trajectories)
+    num_pages = math.ceil(len(users) / USERS_PER_PAGE)
+    page = st.number_input(
+        f"Página de usuários (1 a {num_pages})",
+        min_value=1,
+        max_value=num_pages,
+        value=1,
+        step=1,
+        key="sequence_page",
+    )
+    st.write(f"**Usuários:** {len(users)}")
+
+    for user_id in users[(page - 1) * USERS_PER_PAGE: page * USERS_PER_PAGE]:
+        # Usuários com muitas redações: quadros amostrados para o gráfico continuar leve
+        fig = animate_trajectory(trajectories[user_id], max_frames=DEFAULT_MAX_FRAMES)
+
         st.write(f"**Usuário:** {user_id}")
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key=f"trajectory_{user_id}")
 
 # Contêiner de resultados (atualizado)
 def result_container(filtered_df, df):
@@ -33,7 +60,11 @@ def result_container(filtered_df, df):
     st.dataframe(filtered_df.head(1000))
 
     # Mostrar resultados por sequência
-    sequence_result_container(filtered_df, df)
+    sequence_result_container(filtered_df, source=df)
+
+def _users_with_min_essays(df, min_essays=3):
+    user_counts = df.groupby('cod_usuario')['cod_usuario'].transform('count')
+    return df[user_counts >= min_essays]
 
 # Função da tela (atualizada)
 def page_sequenceEssays():
@@ -50,12 +81,20 @@ def page_sequenceEssays():
     )
 
     # Carregar DataFrame
-    df = load_data(method='csv', path='data/conteudo_adaptativoc2_dados_selecionados.csv')
-    user_counts = df.groupby('cod_usuario')['cod_usuario'].transform('count')
-    df = df[user_counts >= 3]
+    only_rule_columns = st.sidebar.checkbox("Carregar apenas colunas usadas nas regras", value=True)
+    df = load_data(
+        method='csv',
+        path='data/conteudo_adaptativoc2_dados_selecionados.csv',
+        columns=required_columns() if only_rule_columns else None,
+    )
+    st.sidebar.caption(describe_load(df))
+    # Usuários com ao menos 3 redações (calculado uma vez por conjunto de dados carregado)
+    df = derived_frame(df, ("min_essays", 3), _users_with_min_essays)
 
     try:
-        df = df.sample(sample_size)
+        # Amostra fixa e reaproveitada entre reruns: outros widgets não sorteiam novas
+        # redações nem refazem índices, catálogos e chaves de cache da amostra
+        df = sample_data(df, sample_size, random_state=0)
     except ValueError:
         st.warning("Número de amostras excede o tamanho do dataset.")
 
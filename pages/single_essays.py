@@ -2,11 +2,14 @@ import streamlit as st
 
 from components.filter_componet import filter_component, apply_filters, toggle_button
 from components.new_rule_component import new_rule_component
+from components.profile_component import profile_component
 
-from utils.load_data import load_data
-from skillStack.simulate_skillstack import simulate_stack
+from utils.load_data import load_data, required_columns, describe_load
+from skillStack.simulate_skillstack import simulate_stack, mean_stack_figure, distribution_figure
+from skillStack.profiling import SimulationProfile
+from skillStack.result_cache import RESULT_CACHE, simulation_key
 
-def result_container(filtered_df, df):
+def result_container(filtered_df, df, profile=None):
     # Mostrar resultados
     st.write("### Linhas Correspondentes")
     num_filtered = len(filtered_df)
@@ -17,9 +20,22 @@ def result_container(filtered_df, df):
     st.write("### Dados Filtrados")
     st.dataframe(filtered_df.head(1000))
 
-    # Simulação e gráfico
-    fig = simulate_stack(filtered_df, output_type="plot")
-    st.plotly_chart(fig)
+    # Simulação e gráficos (a partir dos agregados por habilidade); sem perfil, o
+    # resultado é reaproveitado enquanto dados, filtros e regras não mudarem
+    if profile is None:
+        summary = RESULT_CACHE.get_or_compute(
+            simulation_key(filtered_df, "summary", sequence_method=False, source=df),
+            lambda: simulate_stack(filtered_df, output_type="summary"),
+        )
+    else:
+        summary = simulate_stack(filtered_df, output_type="summary", profile=profile)
+    st.plotly_chart(mean_stack_figure(summary))
+
+    st.write("### Distribuição dos Pesos")
+    st.plotly_chart(distribution_figure(summary))
+    st.dataframe(summary.to_frame().loc[lambda stats: stats["positivas"] > 0])
+    if profile is not None:
+        profile_component(profile)
 
 # Função da tela de filtros
 def page_singleEssays():
@@ -36,7 +52,14 @@ def page_singleEssays():
     )
 
     # Carregar DataFrame
-    df = load_data(method='csv', path='data/conteudo_adaptativoc2_dados_selecionados.csv')
+    only_rule_columns = st.sidebar.checkbox("Carregar apenas colunas usadas nas regras", value=True)
+    df = load_data(
+        method='csv',
+        path='data/conteudo_adaptativoc2_dados_selecionados.csv',
+        columns=required_columns() if only_rule_columns else None,
+    )
+    st.sidebar.caption(describe_load(df))
+    profile = SimulationProfile() if st.sidebar.checkbox("Perfilar simulação", value=False) else None
     try: df.sample(sample_size)
     except ValueError:
         st.warning("Número de amostras excede o tamanho do dataset.")
@@ -64,7 +87,7 @@ def page_singleEssays():
 
     filtered_df = apply_filters(df, filters)
     
-    result_container(filtered_df, df)
+    result_container(filtered_df, df, profile)
     new_rule_component(filters, df)
 
 if __name__ == '__main__':
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+
+def top_skill_mask(states: np.ndarray, k: int = 1, ties: bool = False):
+    """
+    Marks, for each row of a stack matrix, the skills in its top k.
+
+    Params:
+    states : np.ndarray
+        The N x skills matrix of stacks, as returned by ``stack_states``.
+    k : int, optional
+        The number of skills per row. Default is 1.
+    ties : bool, optional
+        If True, every skill tied with the k-th highest value is included, so a
+        row may have more than k skills marked. If False, ties are broken by the
+        lowest skill index (the order ``sorted`` gives for a stack dict), and
+        exactly k skills are marked. Default is False.
+
+    Returns:
+    np.ndarray
+        A boolean N x skills matrix.
+    """
+    states = np.asarray(states, dtype=np.float64)
+    rows, size = states.shape
+    k = min(k, size)
+    mask = np.zeros((rows, size), dtype=bool)
+    if k <= 0 or rows == 0:
+        return mask
+
+    if k == 1 and not ties:
+        mask[np.arange(rows), states.argmax(axis=1)] = True
+        return mask
+
+    # Valor do k-ésimo maior de cada linha
+    threshold = np.partition(states, size - k, axis=1)[:, size - k, None]
+    if ties:
+        return states >= threshold
+
+    above = states > threshold
+    tied = states == threshold
+    # Completa com os primeiros empates até ter k habilidades por linha
+    missing = k - above.sum(axis=1, keepdims=True)
+    return above | (tied & (np.cumsum(tied, axis=1) <= missing))
+
+
+def top_skill_counts(states: np.ndarray, skills, k: int = 1, ties: bool = False, by=None):
+    """
+    Counts how many times each skill is in the top k of a stack.
+
+    Params:
+    states : np.ndarray
+        The N x skills matrix of stacks, as returned by ``stack_states``.
+    skills : list
+        The skills, in the order of the columns of ``states``.
+    k, ties : optional
+        See ``top_skill_mask``.
+    by : array-like, optional
+        One key per row (e.g. ``cod_usuario`` or a score band); the counts are
+        broken down by its values.
+
+    Returns:
+    pd.Series or pd.DataFrame
+        Without ``by``, the counts of the skills that appear at least once,
+        highest first. With ``by``, a DataFrame with one row per key and one
+        column per skill.
+    """
+    mask = top_skill_mask(states, k, ties)
+    if by is None:
+        counts = pd.Series(mask.sum(axis=0), index=list(skills), name="contagem")
+        counts = counts[counts > 0]
+        return counts.sort_values(ascending=False, kind="stable")
+
+    codes, keys = pd.factorize(np.asarray(by), use_na_sentinel=False)
+    rows, columns = np.nonzero(mask)
+    size = len(skills)
+    counts = np.bincount(codes[rows] * size + columns, minlength=len(keys) * size)
+    return pd.DataFrame(counts.reshape(len(keys), size), index=keys, columns=list(skills))
+
+
+# Faixas padrão dos histogramas: 0 a 20 (escala dos gráficos de pilha) em passos de 0.5
+DEFAULT_BIN_EDGES = np.linspace(0, 20, 41)
+
+
+class StackSummary:
+    """
+    Running per-skill aggregates of stacks: sum, count, number of positive
+    values, min, max and a fixed-bin histogram.
+
+    Stacks are added in blocks (``update``) or as dicts (``update_stacks``) and
+    never stored, so memory is O(skills x bins) whatever the number of rows.
+    Values outside the bin edges are counted in the first or last bin.
+    """
+
+    def __init__(self, skills, bin_edges=DEFAULT_BIN_EDGES):
+        self.skills = list(skills)
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        size = len(self.skills)
+        self.rows = 0
+        self.sums = np.zeros(size, dtype=np.float64)
+        self.positive = np.zeros(size, dtype=np.int64)
+        self.minimum = np.full(size, np.inf)
+        self.maximum = np.full(size, -np.inf)
+        self.histogram = np.zeros((size, len(self.bin_edges) - 1), dtype=np.int64)
+
+    def update(self, states: np.ndarray):
+        """
+        Adds a block of stacks (rows x skills, columns ordered as ``skills``).
+        """
+        states = np.asarray(states, dtype=np.float64)
+        if len(states) == 0:
+            return
+        self.rows += len(states)
+        self.sums += states.sum(axis=0)
+        self.positive += (states > 0).sum(axis=0)
+        np.minimum(self.minimum, states.min(axis=0), out=self.minimum)
+        np.maximum(self.maximum, states.max(axis=0), out=self.maximum)
+
+        bins = len(self.bin_edges) - 1
+        codes = np.clip(np.searchsorted(self.bin_edges, states, side="right") - 1, 0, bins - 1)
+        codes += np.arange(len(self.skills)) * bins
+        self.histogram += np.bincount(codes.ravel(), minlength=self.histogram.size).reshape(self.histogram.shape)
+
+    def update_stacks(self, stacks, batch: int = 4096):
+        """
+        Adds stack dicts (skill -> value, missing skills count as 0) in blocks
+        of ``batch`` rows.
+        """
+        block = []
+        for stack in stacks:
+            block.append([stack.get(skill, 0.0) for skill in self.skills])
+            if len(block) == batch:
+                self.update(block)
+                block = []
+        if block:
+            self.update(block)
+
+    def mean(self):
+        """
+        Returns the mean value of each skill over all rows as a Series.
+        """
+        return pd.Series(self.sums / max(self.rows, 1), index=self.skills)
+
+    def to_frame(self):
+        """
+        Returns one row per skill with the mean, min, max and the share of rows
+        where the skill is positive.
+        """
+        seen = self.rows > 0
+        return pd.DataFrame(
+            {
+                "media": self.mean(),
+                "minimo": self.minimum if seen else np.nan,
+                "maximo": self.maximum if seen else np.nan,
+                "positivas": self.positive / max(self.rows, 1),
+            },
+            index=self.skills,
+        )
+
+    def histogram_frame(self):
+        """
+        Returns the histograms as a skills x bins DataFrame, with the bins
+        labelled by their lower edge.
+        """
+        return pd.DataFrame(self.histogram, index=self.skills, columns=self.bin_edges[:-1])
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Orçamento de quadros usado pelas páginas (simulate_stack e animate_trajectory mostram
+# todas as redações, a menos que recebam max_frames); acima disso as redações são amostradas
+DEFAULT_MAX_FRAMES = 200
+
+
+def frame_rows(n_rows: int, max_frames: int = DEFAULT_MAX_FRAMES):
+    """
+    Returns the rows shown as animation frames: all of them if they fit in
+    ``max_frames``, otherwise ``max_frames`` evenly spaced rows, always
+    including the first and the last one.
+    """
+    if max_frames is None or n_rows <= max_frames:
+        return np.arange(n_rows)
+    return np.unique(np.linspace(0, n_rows - 1, max(max_frames, 2)).round().astype(np.intp))
+
+
+def animation_payload(states: np.ndarray, skills, iterations=None, top_k: int = None):
+    """
+    Builds the compact data of a stack animation.
+
+    Params:
+    states : np.ndarray
+        The frames x skills matrix with the stack shown in each frame.
+    skills : list
+        The skills, in the order of the columns of ``states``.
+    iterations : array-like, optional
+        The label of each frame (the 1-based position of its essay). Default is
+        1, 2, ...
+    top_k : int, optional
+        Shows only the k highest skills of each frame. Default is every skill.
+
+    Returns:
+    dict
+        A JSON-serializable dict with ``skills``, ``iterations``, ``top`` (the
+        skill indices shown in each frame, highest first, -1 for empty slots),
+        ``weights`` (their values) and ``range_y``. Only positive weights are
+        shown, as in the original animation.
+    """
+    states = np.asarray(states, dtype=np.float64).reshape(-1, len(skills))
+    n_frames, n_skills = states.shape
+    if iterations is None:
+        iterations = np.arange(1, n_frames + 1)
+    k = n_skills if top_k is None else min(top_k, n_skills)
+
+    # Habilidades de cada quadro em ordem decrescente (empates pela ordem das colunas)
+    order = np.argsort(-states, axis=1, kind="stable")[:, :k]
+    weights = np.take_along_axis(states, order, axis=1)
+    shown = weights > 0
+    order = np.where(shown, order, -1)
+    weights = np.where(shown, weights, 0.0)
+
+    y_max = float(weights.max()) if weights.size else 0.0
+    return {
+        "skills": list(skills),
+        "iterations": np.asarray(iterations).tolist(),
+        "top": order.tolist(),
+        "weights": weights.tolist(),
+        "range_y": [0.0, y_max * 1.05 if y_max > 0 else 1.0],
+    }
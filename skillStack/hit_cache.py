@@ -0,0 +1,106 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from skillStack.rule_engine import rule_hits
+from utils.fingerprint import dataset_fingerprint
+
+
+class HitMatrixCache:
+    """
+    Per-rule hit masks and per-skill weight columns, keyed by dataset fingerprint.
+
+    A rule's mask only depends on its expression and the data, and a skill's
+    weight column only on the masks and weights of its rules. After a rule is
+    added or edited, only the masks of new expressions and the columns of the
+    skills whose rules changed are recomputed; everything else is reused.
+    """
+
+    def __init__(self, max_datasets: int = 4):
+        self.max_datasets = max_datasets
+        self._datasets = OrderedDict()
+
+    def weight_matrix(self, df, ruleset, profile=None):
+        """
+        Returns ``ruleset.weight_matrix(df)``, reusing cached masks and columns.
+        With a ``profile``, reused rules are recorded with mode ``cache``.
+        """
+        entry = self._entry(dataset_fingerprint(df))
+        positions = {id(rule): i for i, rule in enumerate(ruleset.rules)}
+        candidates = None
+        masks, columns = {}, {}
+        # Montada por habilidade (linhas contíguas) e transposta no final
+        weights = np.empty((len(ruleset.skills), len(df)), dtype=np.float64)
+
+        rows = None
+        for i, skill in enumerate(ruleset.skills):
+            rules = ruleset.rules_by_skill[skill]
+            key = _skill_key(rules)
+            column = entry["columns"].get(key) if key else None
+            if column is not None and profile is not None:
+                for rule in rules:
+                    packed = entry["masks"][_rule_key(rule)]
+                    hits = np.unpackbits(packed, count=len(df)).sum()
+                    profile.record_rule(positions[id(rule)], rule, 0.0, hits, mode="cache")
+            if column is None:
+                column = np.zeros(len(df), dtype=np.float64)
+                for rule in rules:
+                    mask_key = _rule_key(rule)
+                    packed = entry["masks"].get(mask_key) if mask_key else None
+                    if packed is not None:
+                        mask = np.unpackbits(packed, count=len(df)).astype(bool)
+                        if profile is not None:
+                            profile.record_rule(positions[id(rule)], rule, 0.0, mask.sum(), mode="cache")
+                    else:
+                        position = positions[id(rule)]
+                        if candidates is None:
+                            candidates = ruleset.index.batch_candidates(df)
+                        if candidates[position]:
+                            mask, rows = rule_hits(df, rule, rows, profile, position)
+                        else:
+                            # Nenhuma linha passa no teste de índice da regra
+                            mask = np.zeros(len(df), dtype=bool)
+                            if profile is not None:
+                                profile.record_rule(position, rule, 0.0, 0, mode="indice")
+                        packed = np.packbits(mask)
+                    if mask_key:
+                        masks[mask_key] = packed
+                    column[mask] += rule["peso"]
+            if key:
+                columns[key] = column
+                for mask_key in key[0]:
+                    if mask_key in entry["masks"]:
+                        masks.setdefault(mask_key, entry["masks"][mask_key])
+            weights[i] = column
+
+        # Mantém apenas o que o ruleset atual usa (versões antigas das regras saem)
+        entry["masks"], entry["columns"] = masks, columns
+        return np.ascontiguousarray(weights.T)
+
+    def clear(self):
+        self._datasets.clear()
+
+    def _entry(self, fingerprint):
+        entry = self._datasets.pop(fingerprint, None) or {"masks": {}, "columns": {}}
+        self._datasets[fingerprint] = entry
+        while len(self._datasets) > self.max_datasets:
+            self._datasets.popitem(last=False)
+        return entry
+
+
+# Cache compartilhado pelas páginas do app
+HIT_CACHE = HitMatrixCache()
+
+
+def _rule_key(rule):
+    if "fonte" not in rule:
+        return None
+    return hashlib.sha1(rule["fonte"].encode()).hexdigest()
+
+
+def _skill_key(rules):
+    mask_keys = tuple(_rule_key(rule) for rule in rules)
+    if None in mask_keys:
+        return None
+    return mask_keys, tuple(rule["peso"] for rule in rules)
@@ -0,0 +1,302 @@
+"""
+Serviço de ingestão contínua: atualiza a pilha do aluno a cada correção recebida.
+
+Lê registros JSON, um por linha, da entrada padrão ou de um socket local:
+- uma redação (as colunas usadas pelas regras e ``cod_usuario``) atualiza a
+  pilha do usuário e não tem resposta;
+- uma consulta ``{"greater": 3, "cod_usuario": 42}`` responde com uma linha
+  ``{"cod_usuario": 42, "greater": [...]}``.
+
+Uso (a partir da raiz do projeto):
+    python -m skillStack.ingest --store skill_stack.db < redacoes.ndjson
+    python -m skillStack.ingest --store skill_stack.db --socket /tmp/skillstack.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from skillStack.rule_engine import DEFAULT_DECAY
+from skillStack.ruleset import RULES_FILE, load_ruleset
+from skillStack.skill_stack import SkillStack
+from skillStack.stack_store import SqliteStackStore, StackStore
+
+# Intervalo (s) entre verificações de alteração do arquivo de regras
+RULES_CHECK_INTERVAL = 1.0
+
+
+class StackCache:
+    """
+    LRU cache of SkillStack instances in front of a StackStore, with
+    write-behind persistence.
+
+    Updated stacks are marked dirty and written in batches (``save_many``) by a
+    background thread every ``flush_interval`` seconds, or sooner when
+    ``max_dirty`` stacks are pending. Evicting a stack never blocks on the
+    store: a dirty stack leaves the cache but stays pending until written, and
+    is read back from there if its user shows up again.
+
+    ``SkillStack.update`` replaces the ``stack`` dict instead of changing it, so
+    the pending dicts are snapshots the writer can read without copying.
+    """
+
+    def __init__(self, store: StackStore, capacity: int = 100_000, flush_interval: float = 1.0, max_dirty: int = 10_000):
+        self.store = store
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_dirty = max_dirty
+        self._stacks = OrderedDict()
+        self._dirty = {}
+        self._flushing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="skillstack-writer", daemon=True)
+        self._writer.start()
+
+    def __len__(self):
+        return len(self._stacks)
+
+    def get(self, user):
+        """
+        Returns the SkillStack of a user, loading it (or creating an empty one)
+        on a miss.
+        """
+        key = str(user)
+        stack = self._stacks.get(key)
+        if stack is not None:
+            self._stacks.move_to_end(key)
+            return stack
+
+        with self._lock:
+            pending = self._dirty.get(key, self._flushing.get(key))
+        if pending is not None:
+            stack = SkillStack(store=self.store)
+            stack.stack_id, stack.stack = key, pending
+        else:
+            stack = SkillStack.load_many([key], self.store)[key]
+        self._stacks[key] = stack
+        if len(self._stacks) > self.capacity:
+            # Uma pilha suja continua pendente em _dirty até ser gravada
+            self._stacks.popitem(last=False)
+        return stack
+
+    def mark_dirty(self, stack: SkillStack):
+        with self._lock:
+            self._dirty[stack.stack_id] = stack.stack
+            full = len(self._dirty) >= self.max_dirty
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Writes every pending stack to the store.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._dirty = self._dirty, {}
+                self._flushing = batch
+            try:
+                if batch:
+                    self.store.save_many(batch)
+            except BaseException:
+                # Devolve o lote para a próxima tentativa sem sobrescrever versões mais novas
+                with self._lock:
+                    self._dirty = {**batch, **self._dirty}
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def close(self):
+        """
+        Stops the writer and writes the pending stacks.
+        """
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Falha ao gravar as pilhas: {e}", file=sys.stderr)
+
+
+class IngestService:
+    """
+    Applies the compiled rules and ``SkillStack.update`` to each essay record as
+    it arrives, keeping the users' stacks in a StackCache.
+
+    Essays of a user must arrive in submission order. The ruleset is reloaded
+    when ``rules.json`` changes (checked at most every RULES_CHECK_INTERVAL
+    seconds).
+
+    Params:
+    store : StackStore
+        Where the stacks are persisted.
+    capacity : int, optional
+        The maximum number of stacks kept in memory. Default is 100000.
+    flush_interval : float, optional
+        The seconds between writes of the updated stacks. Default is 1.
+    user_column : str, optional
+        The field with the user of each essay. Default is ``cod_usuario``.
+    rules_path : str, optional
+        The rules file. Default is ``rules.json``.
+    """
+
+    def __init__(
+        self,
+        store: StackStore,
+        capacity: int = 100_000,
+        flush_interval: float = 1.0,
+        user_column: str = "cod_usuario",
+        rules_path: str = RULES_FILE,
+    ):
+        self.cache = StackCache(store, capacity, flush_interval)
+        self.user_column = user_column
+        self.rules_path = rules_path
+        self.ingested = 0
+        self._rules_checked = None
+        self._refresh_rules()
+
+    def ingest(self, record: dict):
+        """
+        Updates the stack of the record's user with its essay and returns the
+        updated SkillStack.
+        """
+        self._refresh_rules()
+        stack = self.cache.get(record[self.user_column])
+        weights = self.ruleset.row_weights(record)
+        decays = self.decays
+        if not stack.stack.keys() <= decays.keys():
+            # Habilidades que saíram das regras: o update as descarta, qualquer decaimento serve
+            decays = {**dict.fromkeys(stack.stack, DEFAULT_DECAY), **decays}
+        stack.update(weights, decays)
+        self.cache.mark_dirty(stack)
+        self.ingested += 1
+        return stack
+
+    def greater(self, user, n: int = 1):
+        """
+        Returns the n skills with the highest values in the stack of a user.
+        """
+        return self.cache.get(user).greater(n)
+
+    def handle_line(self, line):
+        """
+        Processes one NDJSON line and returns the response line (bytes), or
+        None when the line has no response.
+        """
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("cada linha deve ser um objeto JSON")
+            if "greater" in record:
+                user = record[self.user_column]
+                response = {self.user_column: user, "greater": self.greater(user, int(record["greater"]))}
+            else:
+                self.ingest(record)
+                return None
+        except (ValueError, KeyError, TypeError) as e:
+            response = {"erro": f"{type(e).__name__}: {e}"}
+        return json.dumps(response, ensure_ascii=False).encode() + b"\n"
+
+    def close(self):
+        self.cache.close()
+
+    def _refresh_rules(self):
+        now = time.monotonic()
+        if self._rules_checked is not None and now - self._rules_checked < RULES_CHECK_INTERVAL:
+            return
+        self._rules_checked = now
+        ruleset = load_ruleset(self.rules_path)
+        if getattr(self, "ruleset", None) is not ruleset:
+            self.ruleset = ruleset
+            self.decays = dict(zip(ruleset.skills, ruleset.decays.tolist()))
+
+
+def serve_stdin(service: IngestService, stdin=None, stdout=None):
+    """
+    Processes the lines of ``stdin`` until it ends, writing the responses to
+    ``stdout``.
+    """
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    for line in stdin:
+        if not line.strip():
+            continue
+        response = service.handle_line(line)
+        if response is not None:
+            stdout.write(response)
+            stdout.flush()
+
+
+async def serve_socket(service: IngestService, path: str = None, port: int = None):
+    """
+    Serves the NDJSON protocol on a Unix socket (``path``) or on a TCP port of
+    127.0.0.1, until cancelled. Every connection shares the same stacks.
+    """
+
+    async def handle(reader, writer):
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                response = service.handle_line(line)
+                if response is not None:
+                    writer.write(response)
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    if path:
+        server = await asyncio.start_unix_server(handle, path)
+    else:
+        server = await asyncio.start_server(handle, "127.0.0.1", port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default="skill_stack.db", help="Banco SQLite das pilhas")
+    parser.add_argument("--rules", default=RULES_FILE, help="Arquivo de regras")
+    parser.add_argument("--capacity", type=int, default=100_000, help="Pilhas mantidas em memória")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="Segundos entre gravações")
+    parser.add_argument("--user-column", default="cod_usuario")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--socket", help="Escuta num socket Unix em vez da entrada padrão")
+    group.add_argument("--port", type=int, help="Escuta numa porta TCP de 127.0.0.1 em vez da entrada padrão")
+    args = parser.parse_args()
+
+    service = IngestService(
+        SqliteStackStore(args.store), args.capacity, args.flush_interval, args.user_column, args.rules
+    )
+    try:
+        if args.socket or args.port:
+            asyncio.run(serve_socket(service, args.socket, args.port))
+        else:
+            serve_stdin(service)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        service.cache.store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from skillStack.ruleset import CompiledRuleSet
+from skillStack.sequence_engine import group_starts, stack_states
+
+# Ruleset compilado uma vez por processo, em _init_worker
+_WORKER_RULESET = None
+
+
+def parallel_stack_states(
+    df: pd.DataFrame,
+    ruleset,
+    sequence_method: bool = False,
+    group_by: str = None,
+    workers: int = 2,
+    chunks_per_worker: int = 4,
+):
+    """
+    Computes ``stack_states`` over chunks of the DataFrame in a process pool.
+
+    Without ``sequence_method`` rows are independent and the chunks are
+    arbitrary; with it, chunk boundaries only fall between ``group_by`` groups,
+    so no user's history is split. A single sequence (no ``group_by``) cannot be
+    split and runs serially, as does a ruleset with rules given only as
+    callables (they cannot be sent to other processes).
+
+    Params:
+    df : pd.DataFrame
+        The essays, in simulation order.
+    ruleset : CompiledRuleSet
+        The rules to be applied. Its rule strings are shipped once per worker.
+    sequence_method, group_by :
+        As in ``stack_states``.
+    workers : int, optional
+        The number of processes. Default is 2.
+    chunks_per_worker : int, optional
+        How many chunks each worker gets on average, to balance the load.
+
+    Returns:
+    np.ndarray
+        The same N x skills matrix as ``stack_states``, in input order.
+    """
+    source_rules = ruleset.source_rules()
+    bounds = _chunk_bounds(df, workers * chunks_per_worker, sequence_method, group_by)
+    if source_rules is None or len(bounds) < 2:
+        return stack_states(df, ruleset, sequence_method, group_by)
+
+    # Só as colunas lidas pelas regras (e a de agrupamento) vão para os processos
+    if all(rule["mascara"] is not None for rule in ruleset.rules):
+        columns = [col for col in df.columns if col in ruleset.columns or col == group_by]
+        df = df[columns]
+
+    chunks = (df.iloc[start:end] for start, end in bounds)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(source_rules,)
+    ) as executor:
+        results = executor.map(
+            _chunk_states,
+            chunks,
+            [sequence_method] * len(bounds),
+            [group_by] * len(bounds),
+        )
+        states = list(results)
+
+    if not states:
+        return np.zeros((0, len(ruleset.skills)), dtype=np.float64)
+    return np.concatenate(states)
+
+
+def _chunk_bounds(df, n_chunks, sequence_method, group_by):
+    n_rows = len(df)
+    if n_rows == 0:
+        return []
+    if sequence_method and not group_by:
+        return [(0, n_rows)]
+
+    targets = np.linspace(0, n_rows, n_chunks + 1).astype(np.intp)
+    if sequence_method:
+        # Cortes apenas no início de um grupo
+        starts = group_starts(df[group_by])
+        cuts = starts[np.minimum(np.searchsorted(starts, targets[1:-1]), len(starts) - 1)]
+        targets = np.r_[0, cuts, n_rows]
+
+    targets = np.unique(targets)
+    return list(zip(targets[:-1].tolist(), targets[1:].tolist()))
+
+
+def _init_worker(source_rules):
+    global _WORKER_RULESET
+    _WORKER_RULESET = CompiledRuleSet.from_rules(source_rules)
+
+
+def _chunk_states(chunk, sequence_method, group_by):
+    return stack_states(chunk, _WORKER_RULESET, sequence_method, group_by)
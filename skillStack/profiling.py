@@ -0,0 +1,63 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class SimulationProfile:
+    """
+    Timings collected by ``simulate_stack(..., profile=SimulationProfile())``.
+
+    Records the time spent in each phase (rule loading, data reading, rule
+    evaluation, stack updates, output) and, for every rule, its evaluation time,
+    hit count, how many rows raised the ``TypeError`` that ``_check_rules``
+    ignores, and how it was evaluated (``vetorizada``, ``linha`` or ``cache``).
+    Nothing is recorded when no profile is passed.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.rules = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record_rule(self, position, rule, seconds, hits, exceptions=0, mode="vetorizada"):
+        stats = self.rules.get(position)
+        if stats is None:
+            stats = self.rules[position] = {
+                "regra": position + 1,
+                "habilidade": rule["habilidade"],
+                "fonte": rule.get("fonte"),
+                "modo": mode,
+                "segundos": 0.0,
+                "acertos": 0,
+                "excecoes": 0,
+            }
+        stats["modo"] = mode
+        stats["segundos"] += seconds
+        stats["acertos"] += int(hits)
+        stats["excecoes"] += int(exceptions)
+
+    def to_dict(self):
+        """
+        Returns the report as a dict with the keys ``fases`` (phase -> seconds),
+        ``regras`` (per-rule stats, slowest first) and ``total``.
+        """
+        return {
+            "fases": dict(self.phases),
+            "regras": sorted(self.rules.values(), key=lambda r: r["segundos"], reverse=True),
+            "total": sum(self.phases.values()),
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), ensure_ascii=False, **kwargs)
+
+
+def profile_phase(profile, name: str):
+    # Contexto que mede a fase apenas quando há um perfil ativo
+    return nullcontext() if profile is None else profile.phase(name)
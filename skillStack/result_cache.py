@@ -0,0 +1,217 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from skillStack.ruleset import load_ruleset
+from utils.fingerprint import dataset_fingerprint, row_set_hash
+
+# Tamanho padrão do nível em memória (bytes)
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+# Itens medidos por contêiner na estimativa de tamanho; o resto é extrapolado
+_SIZE_SAMPLE = 64
+
+
+def _estimate_size(value, seen=None):
+    """
+    Returns an estimate of the memory held by ``value`` without serializing
+    it: ``nbytes`` for arrays, the shallow ``memory_usage`` for pandas objects
+    and, for containers and plain objects, their own size plus that of what
+    they reference (extrapolated from the first ``_SIZE_SAMPLE`` items of
+    larger containers). Each object is counted once.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage())
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (dict, list, tuple, set, frozenset)):
+        items = value.items() if isinstance(value, dict) else value
+        sample = list(islice(items, _SIZE_SAMPLE))
+        if sample:
+            measured = sum(_estimate_size(item, seen) for item in sample)
+            size += measured * len(value) // len(sample)
+    elif hasattr(value, "__dict__"):
+        size += _estimate_size(vars(value), seen)
+    return size
+
+
+class SimulationResultCache:
+    """
+    Results of simulations keyed by their inputs, in a memory-bounded LRU tier
+    and an optional on-disk tier.
+
+    Values are stored as given and returned as the same object on memory hits,
+    so callers must not modify them. With a disk tier their size is measured by
+    their pickle, which is what it writes (one file per key, replaced
+    atomically, the oldest files removed above ``max_disk_bytes``); without one
+    it is estimated from the arrays and objects they hold, without pickling.
+    The cache can be shared by threads; ``compute()`` runs outside its lock,
+    so concurrent misses of the same key may compute it more than once.
+
+    Params:
+    max_bytes : int, optional
+        The memory tier size. Default is 256 MB.
+    directory : str, optional
+        The directory of the disk tier. Default is no disk tier.
+    max_disk_bytes : int, optional
+        The disk tier size. Default is 2 GB.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, directory: str = None, max_disk_bytes: int = 2 * 2**30):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute):
+        """
+        Returns the result stored under ``key``, calling ``compute()`` and
+        storing its result on a miss.
+        """
+        # As sessões do Streamlit rodam em threads e compartilham RESULT_CACHE
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        data = self._read_disk(key)
+        if data is not None:
+            try:
+                value = pickle.loads(data)
+                hit = True
+            except Exception:
+                # Arquivo corrompido ou de outra versão do código: recalcula
+                data = None
+        if data is None:
+            value = compute()
+            hit = False
+            if self.directory:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                self._write_disk(key, data)
+        size = len(data) if data is not None else _estimate_size(value)
+        return self._remember(key, value, size, hit)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remember(self, key, value, size, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            # Outra thread pode ter guardado a mesma chave enquanto esta calculava: fica a primeira
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+        return value
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            # Marca o uso para a limpeza por data de acesso
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            return None
+        return data
+
+    def _write_disk(self, key, data):
+        if not self.directory or len(data) > self.max_disk_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{key}.", suffix=".tmp", dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".pkl")]
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+            if total <= self.max_disk_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def simulation_key(data, output_type: str, sequence_method: bool, source=None, **params):
+    """
+    Returns the cache key of a simulation of ``data``.
+
+    The key combines the dataset fingerprint, the hash of the simulated rows,
+    the version (content hash) of ``rules.json``, ``sequence_method``,
+    ``output_type`` and any other parameter that changes the result.
+
+    Params:
+    data : pd.DataFrame
+        The simulated essays.
+    output_type : str
+        The kind of result (e.g. ``summary`` or ``top_skills``).
+    sequence_method : bool
+        Whether the stack carries over between essays.
+    source : pd.DataFrame, optional
+        The dataset ``data`` was filtered from. If its index is unique, ``data``
+        is identified by the fingerprint of ``source`` plus its row labels
+        (none when ``data`` is ``source`` itself) instead of by hashing its
+        values. The fingerprint is memoized per object, and frames loaded
+        through the Arrow cache or sampled with ``sample_data`` get it from
+        their cache file and sample parameters without any hashing.
+    **params :
+        Other parameters of the simulation, as ``repr``-able values.
+
+    Returns:
+    str
+        A hex digest.
+    """
+    if source is not None and source.index.is_unique:
+        dataset, rows = dataset_fingerprint(source), None if data is source else row_set_hash(data)
+    else:
+        dataset, rows = dataset_fingerprint(data), None
+    parts = (dataset, rows, load_ruleset().version, bool(sequence_method), output_type, sorted(params.items()))
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+# Cache compartilhado pelas páginas do app; o nível em disco é ligado pela variável de ambiente
+RESULT_CACHE = SimulationResultCache(directory=os.environ.get("SKILLSTACK_RESULT_CACHE_DIR"))
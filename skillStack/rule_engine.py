@@ -0,0 +1,508 @@
+import ast
+import keyword
+import operator
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DECAY = 0.5
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+_CONSTANT_TYPES = (bool, int, float, str)
+
+
+class UnsupportedRule(ValueError):
+    """Raised when a rule expression cannot be compiled to a columnar mask."""
+
+
+def parse_rule(source: str):
+    """
+    Parses a rule into its condition node, without evaluating anything.
+
+    Two syntaxes are accepted: the rule DSL, where columns are bare names
+    (``(cod_condicional == 9) & (num_pontuacao_eixo_2 >= 120)``), and the
+    legacy ``lambda vars: ...`` strings, where columns are read through
+    ``vars.get('col')`` or ``vars['col']``.
+
+    Params:
+    source : str
+        The rule string.
+
+    Returns:
+    tuple
+        The condition node and the lambda parameter name (None for DSL rules).
+
+    Raises:
+    UnsupportedRule
+        If the string is not valid Python or is a lambda with other parameters.
+    """
+    if not isinstance(source, str):
+        raise UnsupportedRule("A regra deve ser um texto.")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise UnsupportedRule(f"Sintaxe inválida: {e.msg}")
+
+    node = tree.body
+    if not isinstance(node, ast.Lambda):
+        return node, None
+    args = node.args
+    if len(args.args) != 1 or args.vararg or args.kwarg or args.kwonlyargs or args.posonlyargs or args.defaults:
+        raise UnsupportedRule("A regra deve receber um único argumento.")
+    return node.body, args.args[0].arg
+
+
+def compile_rule(source: str):
+    """
+    Compiles a rule string into a columnar mask function.
+
+    Only the rule language is supported: column lookups, comparisons (including
+    chained ones and ``in``/``not in`` lists of constants), ``&``/``|``/``~``
+    between conditions and ``and``/``or``/``not``.
+
+    Params:
+    source : str
+        The rule string, in the DSL or in the legacy ``lambda vars: ...`` form.
+
+    Returns:
+    callable or None
+        A function that receives a DataFrame and returns a boolean numpy array
+        with one entry per row, or None if the rule cannot be compiled.
+    """
+    try:
+        node, arg = parse_rule(source)
+        condition = _compile_condition(node, arg)
+    except UnsupportedRule:
+        return None
+
+    def mask(df):
+        result = condition(df)
+        if not isinstance(result, pd.Series):
+            raise UnsupportedRule("A regra não depende de nenhuma coluna.")
+        return result.to_numpy(dtype=bool, na_value=False)
+
+    return mask
+
+
+def compile_row_rule(source: str):
+    """
+    Compiles a rule string into a function of one row (a dict of column values),
+    as ``eval`` of the legacy strings used to produce.
+
+    Columns missing from the row are read as None, comparisons and ``&``/``|``
+    follow Python semantics (so a comparison that raises ``TypeError`` makes
+    the whole rule raise, as before), and ``~`` is the logical negation.
+
+    Params:
+    source : str
+        The rule string, in the DSL or in the legacy ``lambda vars: ...`` form.
+
+    Returns:
+    callable
+        A function that receives the row dict and returns the rule's value.
+
+    Raises:
+    UnsupportedRule
+        If the rule uses anything outside the rule language.
+    """
+    node, arg = parse_rule(source)
+    return _compile_row_condition(node, arg)
+
+
+def migrate_rule(source: str):
+    """
+    Converts a legacy ``lambda vars: ...`` rule string into the DSL (DSL rules
+    are returned stripped).
+
+    Raises:
+    UnsupportedRule
+        If the rule uses anything outside the rule language or reads a column
+        whose name is not a valid identifier.
+    """
+    node, arg = parse_rule(source)
+    _row_expression(node, arg)
+    if arg is None:
+        return source.strip()
+
+    class ColumnNames(ast.NodeTransformer):
+        def visit(self, child):
+            column = _column_name(child, arg)
+            if column is None:
+                return super().visit(child)
+            if not column.isidentifier() or keyword.iskeyword(column):
+                raise UnsupportedRule(f"Nome de coluna inválido na linguagem de regras: '{column}'")
+            return ast.Name(id=column, ctx=ast.Load())
+
+    return ast.unparse(ColumnNames().visit(node))
+
+
+def validate_rule(source: str, columns=None):
+    """
+    Checks that a rule string belongs to the rule language and, if ``columns``
+    (e.g. ``df.columns``) is given, that every column it reads exists.
+
+    Raises:
+    UnsupportedRule
+        With a message describing the problem.
+    """
+    compile_row_rule(source)
+    if columns is not None:
+        missing = referenced_columns(source) - set(columns)
+        if missing:
+            raise UnsupportedRule(f"Colunas inexistentes: {', '.join(sorted(missing))}")
+
+
+def referenced_columns(source: str):
+    """
+    Returns the set of columns a rule string reads, whether or not the rule
+    can be compiled.
+    """
+    try:
+        node, arg = parse_rule(source)
+    except UnsupportedRule:
+        return set()
+    columns = set()
+    for child in ast.walk(node):
+        column = _column_name(child, arg)
+        if column is not None:
+            columns.add(column)
+    return columns
+
+
+def column_constants(source: str):
+    """
+    Returns, for each column a rule string compares, the constants it is
+    compared with (e.g. ``{'cod_condicional': {9}}``).
+    """
+    constants = {}
+    try:
+        node, arg = parse_rule(source)
+    except UnsupportedRule:
+        return constants
+    for child in ast.walk(node):
+        if not isinstance(child, ast.Compare):
+            continue
+        operands = [child.left] + list(child.comparators)
+        for left, right in zip(operands, operands[1:]):
+            for column_node, value_node in ((left, right), (right, left)):
+                column = _column_name(column_node, arg)
+                if column is None:
+                    continue
+                values = value_node.elts if isinstance(value_node, (ast.List, ast.Tuple, ast.Set)) else [value_node]
+                for value in values:
+                    try:
+                        constants.setdefault(column, set()).add(_constant(value))
+                    except UnsupportedRule:
+                        pass
+    return constants
+
+
+def rule_skills(rules):
+    """
+    Returns the skills referenced by the rules, in order of first appearance,
+    together with the decay of each skill (taken from its first rule).
+    """
+    skills = {}
+    for rule in rules:
+        if rule["habilidade"] not in skills:
+            skills[rule["habilidade"]] = rule.get("decaimento", DEFAULT_DECAY)
+    return list(skills), np.array(list(skills.values()), dtype=np.float64)
+
+
+def rule_weight_matrix(df: pd.DataFrame, rules, skills=None, decays=None, profile=None, candidates=None):
+    """
+    Evaluates every rule over the whole DataFrame at once.
+
+    Rules that cannot be compiled (or whose columnar evaluation fails) fall back
+    to the per-row evaluation used by ``_check_rules``, so the result is the same
+    as calling it on every row.
+
+    Params:
+    df : pd.DataFrame
+        The essays to be evaluated.
+    rules : list
+        The rules, as returned by ``_load_rules``.
+    skills, decays : optional
+        The precomputed result of ``rule_skills(rules)``.
+    profile : SimulationProfile, optional
+        Receives the time, hits and ignored errors of each rule.
+    candidates : np.ndarray, optional
+        A boolean array marking the rules that may apply to some row (see
+        ``RuleIndex.batch_candidates``); the others are skipped.
+
+    Returns:
+    tuple
+        The N x skills weight matrix, the list of skills (columns of the matrix)
+        and the array with the decay of each skill.
+    """
+    if skills is None or decays is None:
+        skills, decays = rule_skills(rules)
+    skill_index = {skill: i for i, skill in enumerate(skills)}
+    weights = np.zeros((len(df), len(skills)), dtype=np.float64)
+
+    rows = None
+    for position, rule in enumerate(rules):
+        if candidates is not None and not candidates[position]:
+            if profile is not None:
+                profile.record_rule(position, rule, 0.0, 0, mode="indice")
+            continue
+        mask, rows = rule_hits(df, rule, rows, profile, position)
+        weights[mask, skill_index[rule["habilidade"]]] += rule["peso"]
+
+    return weights, skills, decays
+
+
+def rule_hits(df: pd.DataFrame, rule, rows=None, profile=None, position=None):
+    """
+    Returns the rows of the DataFrame where a rule is true.
+
+    Params:
+    df : pd.DataFrame
+        The essays to be evaluated.
+    rule : dict
+        The rule, as returned by ``_load_rules``.
+    rows : list, optional
+        The row dicts of ``df``, if already built by a previous call.
+    profile : SimulationProfile, optional
+        Receives the time, hits and ignored errors of the rule.
+    position : int, optional
+        The index of the rule in the ruleset, used to identify it in ``profile``.
+
+    Returns:
+    tuple
+        The boolean hit mask and the row dicts (None if the rule did not need
+        them), to be passed to the next call.
+    """
+    start = time.perf_counter() if profile is not None else None
+    mask = _rule_mask(rule, df)
+    if mask is not None:
+        if profile is not None:
+            profile.record_rule(position, rule, time.perf_counter() - start, mask.sum())
+        return mask, rows
+
+    # Regra não vetorizável: avalia linha a linha como em _check_rules
+    if rows is None:
+        rows = [row._asdict() for row in df.itertuples(index=False)]
+    mask = np.zeros(len(rows), dtype=bool)
+    rule_func = rule["regra"]
+    errors = 0
+    for i, variables in enumerate(rows):
+        try:
+            if rule_func(variables):
+                mask[i] = True
+        except TypeError:
+            errors += 1
+    if profile is not None:
+        profile.record_rule(position, rule, time.perf_counter() - start, mask.sum(), errors, "linha")
+    return mask, rows
+
+
+def _rule_mask(rule, df):
+    if "mascara" in rule:
+        mask_func = rule["mascara"]
+    else:
+        mask_func = compile_rule(rule.get("fonte", rule["regra"]))
+    if mask_func is None:
+        return None
+    try:
+        return mask_func(df)
+    except Exception:
+        return None
+
+
+def _compile_condition(node, arg):
+    if isinstance(node, ast.Compare):
+        return _compile_compare(node, arg)
+
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+        left = _compile_condition(node.left, arg)
+        right = _compile_condition(node.right, arg)
+        combine = operator.and_ if isinstance(node.op, ast.BitAnd) else operator.or_
+        return lambda df: combine(left(df), right(df))
+
+    if isinstance(node, ast.BoolOp):
+        values = [_compile_condition(value, arg) for value in node.values]
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+
+        def bool_op(df):
+            result = values[0](df)
+            for value in values[1:]:
+                result = combine(result, value(df))
+            return result
+
+        return bool_op
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert)):
+        operand = _compile_condition(node.operand, arg)
+        return lambda df: ~operand(df)
+
+    raise UnsupportedRule(f"Expressão não suportada: {ast.unparse(node)}")
+
+
+def _compile_compare(node, arg):
+    operands = [node.left] + list(node.comparators)
+    parts = []
+    for left, op, right in zip(operands, node.ops, operands[1:]):
+        if isinstance(op, (ast.In, ast.NotIn)):
+            parts.append(_compile_membership(left, op, right, arg))
+        elif type(op) in _COMPARE_OPS:
+            left_value = _compile_value(left, arg)
+            right_value = _compile_value(right, arg)
+            compare = _COMPARE_OPS[type(op)]
+            parts.append(
+                lambda df, l=left_value, r=right_value, c=compare: c(l(df), r(df))
+            )
+        else:
+            raise UnsupportedRule(f"Operador não suportado: {ast.unparse(node)}")
+
+    if len(parts) == 1:
+        return parts[0]
+
+    def chained(df):
+        result = parts[0](df)
+        for part in parts[1:]:
+            result = result & part(df)
+        return result
+
+    return chained
+
+
+def _compile_membership(left, op, right, arg):
+    column = _column_name(left, arg)
+    if column is None or not isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+        raise UnsupportedRule(f"'in' exige uma coluna e uma lista de constantes: {ast.unparse(right)}")
+
+    values = [_constant(element) for element in right.elts]
+    negate = isinstance(op, ast.NotIn)
+
+    def membership(df):
+        result = _column(df, column).isin(values)
+        return ~result if negate else result
+
+    return membership
+
+
+def _compile_value(node, arg):
+    column = _column_name(node, arg)
+    if column is not None:
+        return lambda df: _column(df, column)
+    value = _constant(node)
+    return lambda df: value
+
+
+def _compile_row_condition(node, arg):
+    # A árvore é reescrita só com nós da linguagem de regras (colunas viram
+    # row.get('col')) e compilada sem builtins: nada além dela é executado
+    tree = ast.Expression(
+        ast.Lambda(
+            args=ast.arguments(posonlyargs=[], args=[ast.arg("row")], kwonlyargs=[], kw_defaults=[], defaults=[]),
+            body=_row_expression(node, arg),
+        )
+    )
+    code = compile(ast.fix_missing_locations(tree), "<regra>", "eval")
+    return eval(code, {"__builtins__": {}})
+
+
+def _row_expression(node, arg):
+    if isinstance(node, ast.Compare):
+        comparators = []
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+                    raise UnsupportedRule(f"'in' exige uma lista de constantes: {ast.unparse(right)}")
+                comparators.append(ast.Tuple(elts=[ast.Constant(_constant(e)) for e in right.elts], ctx=ast.Load()))
+            elif type(op) in _COMPARE_OPS:
+                comparators.append(_row_value(right, arg))
+            else:
+                raise UnsupportedRule(f"Operador não suportado: {ast.unparse(node)}")
+        return ast.Compare(left=_row_value(node.left, arg), ops=list(node.ops), comparators=comparators)
+
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+        return ast.BinOp(left=_row_expression(node.left, arg), op=node.op, right=_row_expression(node.right, arg))
+
+    if isinstance(node, ast.BoolOp):
+        return ast.BoolOp(op=node.op, values=[_row_expression(value, arg) for value in node.values])
+
+    # ~ é a negação lógica (em um bool do Python, ~True seria -2)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert)):
+        return ast.UnaryOp(op=ast.Not(), operand=_row_expression(node.operand, arg))
+
+    raise UnsupportedRule(f"Expressão não suportada: {ast.unparse(node)}")
+
+
+def _row_value(node, arg):
+    column = _column_name(node, arg)
+    if column is not None:
+        return ast.Call(
+            func=ast.Attribute(value=ast.Name(id="row", ctx=ast.Load()), attr="get", ctx=ast.Load()),
+            args=[ast.Constant(column)],
+            keywords=[],
+        )
+    return ast.Constant(_constant(node))
+
+
+def _column(df, column):
+    series = df[column]
+    # Datas e intervalos têm coerções próprias no pandas (ex.: comparação com
+    # strings) que não existem linha a linha; essas regras usam o caminho por linha
+    dtype = series.dtype
+    if not (
+        pd.api.types.is_numeric_dtype(dtype)
+        or pd.api.types.is_object_dtype(dtype)
+        or pd.api.types.is_string_dtype(dtype)
+        or isinstance(dtype, pd.CategoricalDtype)
+    ) or pd.api.types.is_timedelta64_dtype(dtype):
+        raise UnsupportedRule(f"Tipo de coluna não suportado: {dtype}")
+    return series
+
+
+def _column_name(node, arg):
+    # DSL: a coluna é o próprio nome
+    if arg is None:
+        return node.id if isinstance(node, ast.Name) else None
+
+    # vars.get('col')
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "get"
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == arg
+        and len(node.args) == 1
+        and not node.keywords
+        and isinstance(node.args[0], ast.Constant)
+        and isinstance(node.args[0].value, str)
+    ):
+        return node.args[0].value
+
+    # vars['col']
+    if (
+        isinstance(node, ast.Subscript)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == arg
+        and isinstance(node.slice, ast.Constant)
+        and isinstance(node.slice.value, str)
+    ):
+        return node.slice.value
+
+    return None
+
+
+def _constant(node):
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _constant(node.operand)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return -value
+    if isinstance(node, ast.Constant) and isinstance(node.value, _CONSTANT_TYPES):
+        if isinstance(node.value, float) and node.value != node.value:
+            raise UnsupportedRule("NaN")
+        return node.value
+    raise UnsupportedRule(f"Valor não suportado: {ast.unparse(node)}")
@@ -0,0 +1,236 @@
+import ast
+import math
+import numbers
+from bisect import bisect_left
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from skillStack.rule_engine import UnsupportedRule, _column_name, _constant, parse_rule
+
+_RANGE_OPS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+# Operador visto do lado da coluna quando a constante está à esquerda (40 <= col)
+_FLIPPED = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE}
+
+
+class RuleIndex:
+    """
+    Index of the rules of a ruleset by a necessary condition of each rule.
+
+    A rule whose expression is a conjunction (``&``/``and``) containing a test
+    of a column against constants can only apply to rows that pass that test,
+    so it is indexed by it: equality tests (``col == 9``, ``col in [4, 9]``)
+    in a hash map from value to rules, range tests (``col >= 40``,
+    ``40 <= col < 200``) in a stabbing table per column. Rules without such a
+    test are always candidates.
+
+    Skipping a rule whose test fails gives the same result as evaluating it:
+    a false term makes the whole conjunction false (or raise ``TypeError``,
+    which also means the rule does not apply).
+    """
+
+    def __init__(self, rules):
+        self.size = len(rules)
+        terms = [_guard_terms(rule.get("fonte")) for rule in rules]
+
+        # A coluna mais usada nas regras costuma separar melhor (ex.: cod_condicional)
+        popularity = Counter(column for rule_terms in terms for column, _ in rule_terms)
+        always = []
+        equality = {}
+        ranges = {}
+        for position, rule_terms in enumerate(terms):
+            guard = _best_guard(rule_terms, popularity)
+            if guard is None:
+                always.append(position)
+            elif guard[0] == "eq":
+                _, column, values = guard
+                table = equality.setdefault(column, {})
+                for value in values:
+                    table.setdefault(value, []).append(position)
+            else:
+                _, column, interval = guard
+                ranges.setdefault(column, []).append((interval, position))
+
+        self.always = always
+        self.equality = {
+            column: {value: tuple(positions) for value, positions in table.items()}
+            for column, table in equality.items()
+        }
+        self._equality_rules = {
+            column: tuple(sorted({p for positions in table.values() for p in positions}))
+            for column, table in self.equality.items()
+        }
+        self.ranges = {column: _IntervalTable(entries) for column, entries in ranges.items()}
+
+    def candidates(self, row: dict):
+        """
+        Returns the positions (ascending) of the rules that may apply to a row.
+        """
+        found = list(self.always)
+        for column, table in self.equality.items():
+            try:
+                found.extend(table.get(row.get(column), ()))
+            except TypeError:
+                # Valor não hasheável: avalia todas as regras da coluna
+                found.extend(self._equality_rules[column])
+        for column, table in self.ranges.items():
+            found.extend(table.stab(row.get(column)))
+        found.sort()
+        return found
+
+    def batch_candidates(self, df: pd.DataFrame):
+        """
+        Returns a boolean array marking the rules that may apply to at least one
+        row of ``df``.
+        """
+        candidates = np.zeros(self.size, dtype=bool)
+        candidates[self.always] = True
+        for column, table in self.equality.items():
+            if column not in df:
+                continue
+            try:
+                present = set(pd.unique(df[column].to_numpy()))
+            except TypeError:
+                candidates[list(self._equality_rules[column])] = True
+                continue
+            for value, positions in table.items():
+                if value in present:
+                    candidates[list(positions)] = True
+        for column, table in self.ranges.items():
+            if column not in df:
+                continue
+            values = df[column]
+            if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+                positions = table.overlapping(values.min(), values.max())
+            else:
+                positions = table.positions
+            candidates[list(positions)] = True
+        return candidates
+
+
+class _IntervalTable:
+    """
+    Static intervals of one column, answering "which intervals contain x" with
+    a binary search over the sorted endpoints (each elementary segment between
+    two endpoints, and each endpoint, has its precomputed list of intervals).
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.positions = tuple(sorted(position for _, position in entries))
+        self.ends = sorted({bound for interval, _ in entries for bound in (interval[0], interval[2]) if math.isfinite(bound)})
+
+        # Representantes: antes do 1º extremo, cada extremo, entre extremos e depois do último
+        probes = []
+        for i, end in enumerate(self.ends):
+            probes.append(end - 1 if i == 0 else (self.ends[i - 1] + end) / 2)
+            probes.append(end)
+        probes.append(self.ends[-1] + 1 if self.ends else 0.0)
+        self.segments = [
+            tuple(sorted(position for interval, position in entries if _contains(interval, probe)))
+            for probe in probes
+        ]
+
+    def stab(self, value):
+        if isinstance(value, (bool, np.bool_)) or not isinstance(value, numbers.Real):
+            # Tipos não numéricos: a comparação pode ter outra semântica, avalia todas
+            return () if value is None else self.positions
+        if value != value:
+            return ()
+        i = bisect_left(self.ends, value)
+        if i < len(self.ends) and self.ends[i] == value:
+            return self.segments[2 * i + 1]
+        return self.segments[2 * i]
+
+    def overlapping(self, low, high):
+        if low != low or high != high:
+            # Coluna só com NaN: nenhuma comparação é verdadeira
+            return ()
+        return tuple(
+            position for (start, start_closed, end, end_closed), position in self.entries
+            if (end > low or (end_closed and end == low)) and (start < high or (start_closed and start == high))
+        )
+
+
+def _contains(interval, value):
+    start, start_closed, end, end_closed = interval
+    return (start < value or (start_closed and start == value)) and (value < end or (end_closed and end == value))
+
+
+def _guard_terms(source):
+    # Termos (coluna, teste) de uma conjunção no topo da expressão
+    try:
+        node, arg = parse_rule(source)
+    except UnsupportedRule:
+        return []
+    terms = []
+    for term in _conjuncts(node):
+        if not isinstance(term, ast.Compare):
+            continue
+        operands = [term.left] + list(term.comparators)
+        # Numa comparação encadeada cada elo é necessário
+        for left, op, right in zip(operands, term.ops, operands[1:]):
+            guard = _term(left, op, right, arg)
+            if guard is not None:
+                terms.append(guard)
+    return terms
+
+
+def _conjuncts(node):
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+        return _conjuncts(node.left) + _conjuncts(node.right)
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        return [term for value in node.values for term in _conjuncts(value)]
+    return [node]
+
+
+def _term(left, op, right, arg):
+    column = _column_name(left, arg)
+    constant_node = right
+    if column is None:
+        column, constant_node = _column_name(right, arg), left
+        op = _FLIPPED.get(type(op), type(op))()
+    if column is None:
+        return None
+
+    try:
+        if isinstance(op, ast.Eq):
+            return column, ("eq", {_constant(constant_node)})
+        if isinstance(op, ast.In) and isinstance(constant_node, (ast.List, ast.Tuple, ast.Set)):
+            return column, ("eq", {_constant(element) for element in constant_node.elts})
+        if isinstance(op, _RANGE_OPS):
+            value = _constant(constant_node)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            if isinstance(op, (ast.Gt, ast.GtE)):
+                return column, ("range", (value, isinstance(op, ast.GtE), math.inf, False))
+            return column, ("range", (-math.inf, False, value, isinstance(op, ast.LtE)))
+    except UnsupportedRule:
+        return None
+    return None
+
+
+def _best_guard(terms, popularity):
+    equality = [(column, test) for column, test in terms if test[0] == "eq"]
+    if equality:
+        column, (_, values) = max(equality, key=lambda term: popularity[term[0]])
+        # Termos de igualdade na mesma coluna se intersectam
+        for other, (_, more) in equality:
+            if other == column:
+                values = values & more
+        return "eq", column, values
+
+    ranges = [(column, test) for column, test in terms if test[0] == "range"]
+    if not ranges:
+        return None
+    column = max(ranges, key=lambda term: popularity[term[0]])[0]
+    start, start_closed, end, end_closed = -math.inf, False, math.inf, False
+    for other, (_, (low, low_closed, high, high_closed)) in ranges:
+        if other != column:
+            continue
+        if low > start or (low == start and not low_closed):
+            start, start_closed = low, low_closed
+        if high < end or (high == end and not high_closed):
+            end, end_closed = high, high_closed
+    return "range", column, (start, start_closed, end, end_closed)
@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+RULES_FILE = "rules.json"
+
+
+class StaleRulesError(RuntimeError):
+    """Raised when the rules changed since the version a write was based on."""
+
+
+class RuleStore:
+    """
+    The rules file, written atomically under a lock and versioned.
+
+    Every write goes to a temporary file that replaces ``path`` with
+    ``os.replace``, so readers see either the old or the new file, never a
+    half-written one. Writers take an exclusive lock on ``<path>.lock``, and
+    each write increments the number stored in ``<path>.version``.
+    """
+
+    def __init__(self, path: str = RULES_FILE):
+        self.path = path
+        self.version_path = f"{path}.version"
+        self.lock_path = f"{path}.lock"
+
+    def version(self):
+        """
+        Returns the current version (0 if the file was never written by a store).
+        This is a read of a few bytes, cheap enough to check on every access.
+        """
+        try:
+            with open(self.version_path) as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def changed(self, version: int):
+        """
+        Returns whether the rules were written since ``version``.
+        """
+        return self.version() != version
+
+    def read(self):
+        """
+        Returns the rules (an empty list if the file does not exist) and the
+        version they correspond to.
+        """
+        # Versão antes do conteúdo: no pior caso a versão é mais antiga que as
+        # regras lidas, e uma gravação baseada nela é recusada, nunca aceita
+        version = self.version()
+        try:
+            with open(self.path) as f:
+                return json.load(f), version
+        except FileNotFoundError:
+            return [], version
+
+    def write(self, rules: list, expected_version: int = None):
+        """
+        Replaces the rules.
+
+        Params:
+        rules : list
+            The rules, in the ``rules.json`` format.
+        expected_version : int, optional
+            The version the new rules were based on (as returned by ``read``).
+            If given and the store moved past it, nothing is written.
+
+        Returns:
+        int
+            The new version.
+
+        Raises:
+        StaleRulesError
+            If ``expected_version`` is not the current version.
+        """
+        with self._locked():
+            return self._write(rules, expected_version)
+
+    def update(self, change):
+        """
+        Reads, changes and writes the rules under the lock, so concurrent
+        updates (e.g. two analysts adding rules) are not lost.
+
+        Params:
+        change : callable
+            Receives the current rules list and returns the new one.
+
+        Returns:
+        int
+            The new version.
+        """
+        with self._locked():
+            rules, version = self.read()
+            return self._write(change(rules), version)
+
+    def _write(self, rules, expected_version):
+        current = self.version()
+        if expected_version is not None and current != expected_version:
+            raise StaleRulesError(
+                f"As regras foram alteradas (versão {current}, esperada {expected_version})."
+            )
+        _atomic_write(self.path, json.dumps(rules, indent=4))
+        _atomic_write(self.version_path, str(current + 1))
+        return current + 1
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _atomic_write(path, text):
+    # Arquivo temporário no mesmo diretório para que os.replace seja atômico
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp cria o arquivo com permissão 0600; mantém a do arquivo original
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
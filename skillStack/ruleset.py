@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from skillStack.rule_index import RuleIndex
+from skillStack.rule_store import RULES_FILE, RuleStore
+from skillStack.rule_engine import (
+    DEFAULT_DECAY,
+    UnsupportedRule,
+    compile_row_rule,
+    compile_rule,
+    migrate_rule,
+    referenced_columns,
+    rule_skills,
+    rule_weight_matrix,
+)
+
+# path -> ((versão do store, inode, mtime_ns, size), sha256, CompiledRuleSet)
+_CACHE = {}
+
+
+@dataclass
+class CompiledRuleSet:
+    rules: list
+    version: str = None
+    skills: list = field(init=False)
+    skill_index: dict = field(init=False)
+    decays: np.ndarray = field(init=False)
+    rule_skill: np.ndarray = field(init=False)
+    rules_by_skill: dict = field(init=False)
+    columns: frozenset = field(init=False)
+    index: RuleIndex = field(init=False)
+
+    def __post_init__(self):
+        self.skills, self.decays = rule_skills(self.rules)
+        self.skill_index = {skill: i for i, skill in enumerate(self.skills)}
+        self.rule_skill = np.array(
+            [self.skill_index[rule["habilidade"]] for rule in self.rules], dtype=np.intp
+        )
+        self.rules_by_skill = {skill: [] for skill in self.skills}
+        for rule in self.rules:
+            self.rules_by_skill[rule["habilidade"]].append(rule)
+        self.columns = frozenset().union(
+            *(referenced_columns(rule.get("fonte")) for rule in self.rules)
+        )
+        self.index = RuleIndex(self.rules)
+
+    @classmethod
+    def from_rules(cls, raw_rules: list, version: str = None):
+        """
+        Validates and compiles rules in the ``rules.json`` format.
+
+        Params:
+        raw_rules : list
+            Rules with the keys ``habilidade``, ``regra``, ``peso`` and, optionally,
+            ``decaimento``. ``regra`` may be a rule string (in the rule language or
+            a legacy ``lambda vars: ...`` string, which is migrated; neither is
+            passed to ``eval``) or an already built callable.
+        version : str, optional
+            Identifier of the source the rules came from.
+
+        Returns:
+        CompiledRuleSet
+            The compiled ruleset.
+
+        Raises:
+        ValueError
+            If a rule is malformed or its string cannot be compiled.
+        """
+        if not isinstance(raw_rules, list):
+            raise ValueError("O arquivo de regras deve conter uma lista de regras.")
+        return cls([_compile(i, rule) for i, rule in enumerate(raw_rules)], version)
+
+    def extend(self, new_rules: list):
+        """
+        Returns a new ruleset with ``new_rules`` placed before the current rules.
+        """
+        if not new_rules:
+            return self
+        compiled = [_compile(i, rule) for i, rule in enumerate(new_rules)]
+        return CompiledRuleSet(compiled + self.rules, None)
+
+    def source_rules(self):
+        """
+        Returns the rules in the ``rules.json`` format (rule strings instead of
+        callables), or None if some rule was given only as a callable.
+        """
+        if any("fonte" not in rule for rule in self.rules):
+            return None
+        return [
+            {
+                "habilidade": rule["habilidade"],
+                "regra": rule["fonte"],
+                "peso": rule["peso"],
+                "decaimento": rule["decaimento"],
+            }
+            for rule in self.rules
+        ]
+
+    def row_weights(self, record):
+        """
+        Evaluates the ruleset over a single essay, skipping the rules the index
+        rules out. Rules that raise ``TypeError`` (e.g. a missing value compared
+        with a number) are ignored, as in ``_check_rules``.
+
+        Params:
+        record : dict
+            The essay's columns.
+
+        Returns:
+        dict
+            Skill -> sum of the weights of its rules that hit, for every skill
+            in ``self.skills``.
+        """
+        weights = dict.fromkeys(self.skills, 0)
+        for position in self.index.candidates(record):
+            rule = self.rules[position]
+            try:
+                if rule["regra"](record):
+                    weights[rule["habilidade"]] += rule["peso"]
+            except TypeError:
+                pass
+        return weights
+
+    def weight_matrix(self, df, hit_cache=None, profile=None):
+        """
+        Evaluates the ruleset over a DataFrame. See ``rule_weight_matrix``.
+
+        Params:
+        df : pd.DataFrame
+            The essays to be evaluated.
+        hit_cache : HitMatrixCache, optional
+            Reuses the masks of rules already evaluated on the same data.
+        profile : SimulationProfile, optional
+            Receives the time, hits and ignored errors of each rule.
+
+        Returns:
+        np.ndarray
+            The N x skills weight matrix, with columns ordered as ``self.skills``.
+        """
+        if hit_cache is not None:
+            return hit_cache.weight_matrix(df, self, profile)
+        # Regras cujo teste de índice não passa em nenhuma linha não são avaliadas
+        candidates = self.index.batch_candidates(df)
+        weights, _, _ = rule_weight_matrix(df, self.rules, self.skills, self.decays, profile, candidates)
+        return weights
+
+
+def load_ruleset(path: str = RULES_FILE):
+    """
+    Returns the compiled ruleset stored in ``path``.
+
+    The result is memoized on the ``RuleStore`` version and the file's stat
+    (which catches edits made outside the store): while neither changes,
+    loading costs a read of the version file and an ``os.stat``; if they change
+    but the content does not, the previous compilation is reused.
+
+    Params:
+    path : str, optional
+        The rules file. Default is ``rules.json``.
+
+    Returns:
+    CompiledRuleSet
+        The compiled ruleset, whose ``version`` is the content hash.
+    """
+    version = RuleStore(path).version()
+    stat = os.stat(path)
+    token = (version, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    cached = _CACHE.get(path)
+    if cached and cached[0] == token:
+        return cached[2]
+
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    if cached and cached[1] == digest:
+        ruleset = cached[2]
+    else:
+        ruleset = CompiledRuleSet.from_rules(json.loads(content), digest)
+
+    _CACHE[path] = (token, digest, ruleset)
+    return ruleset
+
+
+def invalidate_ruleset(path: str = RULES_FILE):
+    """
+    Drops the memoized ruleset of ``path``. Writes through ``RuleStore`` do not
+    need it; it is only required after editing the file in a way that keeps
+    its size and mtime.
+    """
+    _CACHE.pop(path, None)
+
+
+def _compile(position, rule):
+    for key in ("habilidade", "regra", "peso"):
+        if key not in rule:
+            raise ValueError(f"Regra {position + 1} sem o campo '{key}'.")
+    if not isinstance(rule["peso"], (int, float)):
+        raise ValueError(f"Regra {position + 1}: 'peso' deve ser numérico.")
+
+    compiled = dict(rule)
+    compiled.setdefault("decaimento", DEFAULT_DECAY)
+    if isinstance(rule["regra"], str):
+        # Regras antigas (lambda vars: ...) são convertidas para a linguagem de regras
+        try:
+            compiled["fonte"] = migrate_rule(rule["regra"])
+            compiled["regra"] = compile_row_rule(compiled["fonte"])
+        except UnsupportedRule as e:
+            raise ValueError(f"Regra {position + 1} inválida: {e}")
+    if "fonte" in compiled:
+        compiled["mascara"] = compile_rule(compiled["fonte"])
+    return compiled
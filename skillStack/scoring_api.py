@@ -0,0 +1,420 @@
+"""
+API HTTP de pontuação em lote: calcula pilhas (ou as k maiores habilidades)
+de redações enviadas por outros serviços.
+
+POST /score com um objeto JSON
+    {"rows": [{...}, ...], "output": "stacks" | "top", "k": 3,
+     "sequence_method": false, "group_by": null, "order_by": "dat_envio"}
+ou com um stream Arrow IPC (Content-Type: application/vnd.apache.arrow.stream),
+com os mesmos parâmetros na query string (/score?output=top&k=3).
+
+Resposta: {"skills": [...], "stacks": [[...], ...]} ou {"top": [[...], ...]},
+uma entrada por linha enviada, na ordem enviada; o top de cada linha tem até k
+habilidades com peso positivo. GET /health informa a fila.
+
+Requisições simultâneas são agrupadas em lotes (até --max-batch-rows linhas
+ou --max-delay-ms de espera) avaliados de uma vez num pool de processos.
+Acima de --max-pending-rows linhas na fila a API responde 503.
+
+Uso (a partir da raiz do projeto):
+    python -m skillStack.scoring_api --port 8080 --workers 4
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from skillStack.ruleset import RULES_FILE, CompiledRuleSet, load_ruleset
+from skillStack.sequence_engine import decay_scan, group_starts, sort_sequences
+from skillStack.stack_matrix import round_stack, top_k
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow é opcional; sem ele só JSON é aceito
+    pa = None
+
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+OUTPUTS = ("stacks", "top")
+
+# Ruleset compilado uma vez por processo, em _init_worker
+_WORKER_RULESET = None
+
+
+class Overloaded(Exception):
+    """Raised when accepting a request would exceed the pending rows limit."""
+
+
+@dataclass
+class ScoringJob:
+    df: pd.DataFrame
+    output: str = "stacks"
+    k: int = 1
+    sequence_method: bool = False
+    group_by: str = None
+    order_by: str = "dat_envio"
+    future: asyncio.Future = field(default=None, repr=False)
+    arrived: float = 0.0
+
+    def spec(self):
+        # O que vai para o processo: tudo menos o future
+        return self.df, self.output, self.k, self.sequence_method, self.group_by, self.order_by
+
+
+class MicroBatcher:
+    """
+    Groups concurrent jobs into batches scored with a single rule evaluation.
+
+    A batch is dispatched when it reaches ``max_batch_rows`` rows or when its
+    oldest job has waited ``max_delay`` seconds, whichever comes first; up to
+    ``workers`` batches run at the same time in the executor, and while they
+    are all busy new jobs accumulate into the next batch. Jobs are
+    refused with ``Overloaded`` while ``max_pending_rows`` rows are queued or
+    running, so a slow backend sheds load instead of growing the queue.
+
+    Params:
+    rules_path : str, optional
+        The rules file; the executor is recreated when it changes.
+    workers : int, optional
+        The number of processes. 0 scores in a thread of this process.
+    max_batch_rows : int, optional
+        The rows per batch. Larger batches raise throughput and latency.
+    max_delay : float, optional
+        The seconds a job may wait for other jobs to join its batch.
+    max_pending_rows : int, optional
+        The rows accepted before refusing new jobs.
+    """
+
+    def __init__(
+        self,
+        rules_path: str = RULES_FILE,
+        workers: int = os.cpu_count(),
+        max_batch_rows: int = 4096,
+        max_delay: float = 0.005,
+        max_pending_rows: int = 100_000,
+    ):
+        self.rules_path = rules_path
+        self.workers = workers
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay
+        self.max_pending_rows = max_pending_rows
+        self.pending_rows = 0
+        self.batches = 0
+        self._queue = asyncio.Queue()
+        self._carry = None
+        self._in_flight = asyncio.Semaphore(max(workers, 1))
+        self._executor = None
+        self._rules_version = None
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, job: ScoringJob):
+        """
+        Queues a job and waits for its result.
+
+        Raises:
+        Overloaded
+            If the pending rows limit would be exceeded.
+        """
+        rows = len(job.df)
+        if self.pending_rows and self.pending_rows + rows > self.max_pending_rows:
+            raise Overloaded(f"{self.pending_rows} linhas pendentes")
+        loop = asyncio.get_running_loop()
+        job.future = loop.create_future()
+        job.arrived = loop.time()
+        self.pending_rows += rows
+        await self._queue.put(job)
+        return await job.future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # O lote só é montado quando há um worker livre: enquanto todos estão
+            # ocupados, as requisições se acumulam na fila e formam lotes maiores
+            await self._in_flight.acquire()
+            first = self._carry or await self._queue.get()
+            self._carry = None
+            batch, rows = [first], len(first.df)
+            deadline = first.arrived + self.max_delay
+            while rows < self.max_batch_rows:
+                if not self._queue.empty():
+                    job = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        job = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if rows + len(job.df) > self.max_batch_rows:
+                    # Fica para o próximo lote
+                    self._carry = job
+                    break
+                batch.append(job)
+                rows += len(job.df)
+
+            asyncio.create_task(self._dispatch(batch, rows))
+
+    async def _dispatch(self, batch, rows):
+        loop = asyncio.get_running_loop()
+        try:
+            executor = self._current_executor()
+            results = await loop.run_in_executor(executor, _score_batch, [job.spec() for job in batch])
+            for job, result in zip(batch, results):
+                if not job.future.done():
+                    job.future.set_result(result)
+        except Exception as e:
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+        finally:
+            self.pending_rows -= rows
+            self.batches += 1
+            self._in_flight.release()
+
+    def _current_executor(self):
+        ruleset = load_ruleset(self.rules_path)
+        if self._executor is None or ruleset.version != self._rules_version:
+            if self._executor is not None:
+                # Lotes em andamento terminam com as regras antigas
+                self._executor.shutdown(wait=False)
+            source_rules = ruleset.source_rules()
+            if self.workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(source_rules,)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, initializer=_init_worker, initargs=(source_rules,)
+                )
+            self._rules_version = ruleset.version
+        return self._executor
+
+
+class ScoringServer:
+    """
+    The HTTP front end of a MicroBatcher (HTTP/1.1 with keep-alive, standard
+    library only).
+    """
+
+    def __init__(self, batcher: MicroBatcher, max_body: int = 64 * 2**20):
+        self.batcher = batcher
+        self.max_body = max_body
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080):
+        self.batcher.start()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.close()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > self.max_body:
+                    writer.write(_response(413, {"erro": "corpo da requisição muito grande"}, close=True))
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._route(method, target, headers, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, close=not keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Servidor encerrando: a conexão é só fechada
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == "/health" and method == "GET":
+            return 200, {
+                "linhas_pendentes": self.batcher.pending_rows,
+                "lotes": self.batcher.batches,
+                "regras": self.batcher._rules_version,
+            }
+        if url.path != "/score":
+            return 404, {"erro": f"rota inexistente: {url.path}"}
+        if method != "POST":
+            return 405, {"erro": "use POST"}
+
+        try:
+            job = _parse_job(headers.get("content-type", ""), body, parse_qs(url.query))
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, {"erro": str(e)}
+        try:
+            return 200, await self.batcher.submit(job)
+        except Overloaded as e:
+            return 503, {"erro": f"API sobrecarregada ({e}), tente novamente"}
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, {"erro": str(e)}
+
+
+def score_jobs(ruleset, specs):
+    """
+    Scores several jobs with a single rule evaluation over all their rows.
+
+    Params:
+    ruleset : CompiledRuleSet
+        The rules to be applied.
+    specs : list
+        The ``ScoringJob.spec()`` of each job: (df, output, k, sequence_method,
+        group_by, order_by).
+
+    Returns:
+    list
+        The response of each job, with one entry per row in the order sent.
+    """
+    frames = []
+    orders = []
+    for df, _, _, sequence_method, group_by, order_by in specs:
+        df = df.reset_index(drop=True)
+        if sequence_method and group_by:
+            # Como em simulate_stack: cada grupo em ordem de envio
+            df = sort_sequences(df, group_by, order_by) if order_by in df else df.sort_values(group_by, kind="stable")
+        orders.append(df.index.to_numpy())
+        frames.append(df)
+
+    weights = ruleset.weight_matrix(pd.concat(frames, ignore_index=True)) if frames else None
+    results = []
+    start = 0
+    for (df, output, k, sequence_method, group_by, _), frame, order in zip(specs, frames, orders):
+        job_weights = weights[start:start + len(frame)]
+        start += len(frame)
+        if not sequence_method:
+            states = round_stack(job_weights)
+        else:
+            starts = group_starts(frame[group_by]) if group_by else None
+            states, _ = decay_scan(job_weights, ruleset.decays, starts)
+
+        # De volta à ordem em que as linhas foram enviadas
+        states = states[np.argsort(order, kind="stable")]
+        if output == "top":
+            # Só habilidades acionadas (peso positivo), como StackMatrix.greater: uma
+            # pilha intocada não tem top; empates na ordem das habilidades
+            skills = ruleset.skills
+            top = []
+            for state in states:
+                positive = np.flatnonzero(state > 0)
+                top.append([skills[positive[i]] for i in top_k(state[positive], k)])
+            results.append({"top": top})
+        else:
+            results.append({"skills": list(ruleset.skills), "stacks": states.tolist()})
+    return results
+
+
+def _init_worker(source_rules):
+    global _WORKER_RULESET
+    _WORKER_RULESET = CompiledRuleSet.from_rules(source_rules)
+
+
+def _score_batch(specs):
+    return score_jobs(_WORKER_RULESET, specs)
+
+
+def _parse_job(content_type, body, query):
+    if content_type.split(";")[0].strip() == ARROW_TYPE:
+        if pa is None:
+            raise ValueError("pyarrow não está instalado; envie JSON")
+        df = pa.ipc.open_stream(io.BytesIO(body)).read_all().to_pandas()
+        params = {name: values[-1] for name, values in query.items()}
+        for name in ("sequence_method",):
+            if name in params:
+                params[name] = params[name].lower() in ("1", "true", "sim")
+    else:
+        params = json.loads(body or b"{}")
+        if not isinstance(params, dict):
+            raise ValueError("o corpo deve ser um objeto JSON")
+        rows = params.pop("rows", None)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("'rows' deve ser uma lista de objetos")
+        df = pd.DataFrame.from_records(rows)
+
+    output = params.get("output", "stacks")
+    if output not in OUTPUTS:
+        raise ValueError(f"'output' deve ser um de {OUTPUTS}")
+    k = int(params.get("k", 1))
+    if k < 1:
+        raise ValueError("'k' deve ser positivo")
+    group_by = params.get("group_by") or None
+    if group_by is not None and group_by not in df:
+        raise ValueError(f"coluna de agrupamento inexistente: {group_by}")
+    return ScoringJob(
+        df,
+        output,
+        k,
+        bool(params.get("sequence_method", False)),
+        group_by,
+        params.get("order_by", "dat_envio"),
+    )
+
+
+def _response(status, payload, close=False):
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    headers = [
+        f"HTTP/1.1 {status} {reasons[status]}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+    ]
+    if status == 503:
+        headers.append("Retry-After: 1")
+    if close:
+        headers.append("Connection: close")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--rules", default=RULES_FILE, help="Arquivo de regras")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos (0: uma thread deste processo)")
+    parser.add_argument("--max-batch-rows", type=int, default=4096, help="Linhas por lote")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0, help="Espera máxima para completar um lote")
+    parser.add_argument("--max-pending-rows", type=int, default=100_000, help="Linhas na fila antes de responder 503")
+    args = parser.parse_args()
+
+    batcher = MicroBatcher(args.rules, args.workers, args.max_batch_rows, args.max_delay_ms / 1000, args.max_pending_rows)
+    print(f"Servindo em http://{args.host}:{args.port}/score")
+    try:
+        asyncio.run(ScoringServer(batcher).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-import json
+# Uso (a partir da raiz do projeto): python -m skillStack.script_start_rules
+from skillStack.rule_store import RuleStore
 
 RULES = [
-    {"habilidade": "habilidade_teste", "regra": "lambda vars: (vars.get('trecho_outro_genero_9') == 0)", "peso": 10},
-    {"habilidade": "outra_habilidade_teste", "regra": "lambda vars: (vars.get('trecho_outro_genero_9') == 0) & (vars.get('num_pontuacao_eixo_2')>=120)", "peso": 5},
+    {"habilidade": "habilidade_teste", "regra": "trecho_outro_genero_9 == 0", "peso": 10},
+    {"habilidade": "outra_habilidade_teste", "regra": "(trecho_outro_genero_9 == 0) & (num_pontuacao_eixo_2 >= 120)", "peso": 5},
 ]
 
-with open("rules.json", "w") as f:
-    json.dump(RULES, f)
\ No newline at end of file
+RuleStore("rules.json").write(RULES)
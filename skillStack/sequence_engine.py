@@ -0,0 +1,311 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from skillStack.hit_cache import HIT_CACHE
+from skillStack.profiling import profile_phase
+from skillStack.ruleset import load_ruleset
+from skillStack.stack_matrix import round_stack
+
+# Linhas por bloco das simulações que só agregam as pilhas (ver iter_state_blocks)
+DEFAULT_BLOCK_ROWS = 65_536
+
+
+def sort_sequences(df: pd.DataFrame, by: str = "cod_usuario", order: str = "dat_envio"):
+    """
+    Sorts the essays by user and, within each user, by submission order.
+    The sort is stable, so essays sent at the same time keep their order.
+    """
+    return df.sort_values([by, order], kind="stable")
+
+
+def group_starts(keys):
+    """
+    Returns the position where each run of equal keys starts.
+
+    Params:
+    keys : array-like
+        The group key of each row, already sorted (or at least contiguous).
+
+    Returns:
+    np.ndarray
+        The first position of each group, in order.
+    """
+    codes, _ = pd.factorize(np.asarray(keys), use_na_sentinel=True)
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.intp)
+    return np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+
+def decay_scan(weights: np.ndarray, decays: np.ndarray, starts=None, initial=None):
+    """
+    Computes every intermediate stack of every sequence at once.
+
+    Each sequence follows the ``SkillStack.update`` recurrence
+    ``s_t = round(s_{t-1} * (1 - decay) + w_t, 2)``. Because of the rounding at
+    every step the recurrence is not a linear filter, so instead of a closed
+    form the scan walks the positions inside the sequences: step ``p`` updates
+    the p-th essay of all sequences in a single vectorized operation, and the
+    number of steps is the length of the longest sequence, not the number of
+    rows.
+
+    Params:
+    weights : np.ndarray
+        The N x skills weight matrix, with the rows of each sequence contiguous
+        and in order.
+    decays : np.ndarray
+        The decay of each skill.
+    starts : np.ndarray, optional
+        The first row of each sequence (see ``group_starts``). Default is a single
+        sequence with all rows.
+    initial : np.ndarray, optional
+        A sequences x skills matrix with the stack each sequence starts from.
+        Default is empty stacks.
+
+    Returns:
+    tuple
+        The N x skills matrix with the stack after each row and the
+        sequences x skills matrix with the final stack of each sequence.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    n_rows, n_skills = weights.shape
+    starts = np.zeros(1 if n_rows else 0, dtype=np.intp) if starts is None else np.asarray(starts)
+    lengths = np.diff(np.r_[starts, n_rows])
+    retention = 1 - np.asarray(decays, dtype=np.float64)
+
+    if initial is None:
+        final = np.zeros((len(starts), n_skills), dtype=np.float64)
+    else:
+        final = np.array(initial, dtype=np.float64)
+    states = np.empty_like(weights)
+    if n_rows == 0:
+        return states, final
+
+    # Sequências da mais longa para a mais curta: as ativas no passo p são um prefixo
+    by_length = np.argsort(-lengths, kind="stable")
+    sorted_lengths = lengths[by_length]
+    sorted_starts = starts[by_length]
+    current = final[by_length]
+
+    for position in range(sorted_lengths[0]):
+        active = np.searchsorted(-sorted_lengths, -position, side="left")
+        rows = sorted_starts[:active] + position
+        current[:active] = round_stack(current[:active] * retention + weights[rows])
+        states[rows] = current[:active]
+
+    final[by_length] = current
+    return states, final
+
+
+def simulate_sequence_stacks(
+    df: pd.DataFrame,
+    ruleset=None,
+    by: str = "cod_usuario",
+    order: str = "dat_envio",
+):
+    """
+    Simulates one skill stack per user over its essays in submission order.
+
+    Params:
+    df : pd.DataFrame
+        The essays, with the columns ``by`` and ``order``.
+    ruleset : CompiledRuleSet, optional
+        The rules to be applied. Default is the ruleset in ``rules.json``.
+    by : str, optional
+        The column identifying the user. Default is ``cod_usuario``.
+    order : str, optional
+        The column that orders the essays of a user. Default is ``dat_envio``.
+
+    Returns:
+    list
+        The same structure as ``simulate_stack(..., output_type="stacks")``: one
+        ``{"cod_correcao_redacao", "stack_result"}`` dict per essay, sorted by
+        (``by``, ``order``).
+    """
+    ruleset = ruleset or load_ruleset()
+    df = sort_sequences(df, by, order)
+    states, _ = decay_scan(
+        ruleset.weight_matrix(df), ruleset.decays, group_starts(df[by])
+    )
+    return [
+        {"cod_correcao_redacao": cod, "stack_result": dict(zip(ruleset.skills, state))}
+        for cod, state in zip(df["cod_correcao_redacao"], states.tolist())
+    ]
+
+
+class SequenceTrajectories(Mapping):
+    """
+    The stacks of every user after each of its essays, keyed by user.
+
+    All stacks live in a single matrix; the per-user DataFrame (one row per
+    essay, one column per skill) is only built when the user is accessed.
+    """
+
+    def __init__(self, users, starts, codes, states, skills):
+        self.users = list(users)
+        self.skills = list(skills)
+        self._codes = np.asarray(codes)
+        self._states = states
+        self._bounds = dict(zip(self.users, zip(starts, np.r_[starts[1:], len(states)])))
+
+    def __getitem__(self, user):
+        start, end = self._bounds[user]
+        return pd.DataFrame(
+            self._states[start:end],
+            index=pd.Index(self._codes[start:end], name="cod_correcao_redacao"),
+            columns=self.skills,
+        )
+
+    def __iter__(self):
+        return iter(self.users)
+
+    def __len__(self):
+        return len(self.users)
+
+    def final_stacks(self):
+        """
+        Returns a users x skills DataFrame with the last stack of each user.
+        """
+        ends = np.array([end for _, end in self._bounds.values()], dtype=np.intp)
+        return pd.DataFrame(self._states[ends - 1], index=self.users, columns=self.skills)
+
+
+def simulate_sequences(
+    df: pd.DataFrame,
+    by: str = "cod_usuario",
+    order: str = "dat_envio",
+    ruleset=None,
+    hit_cache=HIT_CACHE,
+):
+    """
+    Simulates every user's sequence in a single pass.
+
+    Params:
+    df : pd.DataFrame
+        The essays, with the columns ``by``, ``order`` and ``cod_correcao_redacao``.
+    by : str, optional
+        The column identifying the user. Default is ``cod_usuario``.
+    order : str, optional
+        The column that orders the essays of a user. Default is ``dat_envio``.
+    ruleset : CompiledRuleSet, optional
+        The rules to be applied. Default is the ruleset in ``rules.json``.
+    hit_cache : HitMatrixCache, optional
+        Cache of rule masks. Default is the cache shared by the app; None
+        disables it.
+
+    Returns:
+    SequenceTrajectories
+        The stack trajectory of each user, keyed by user.
+    """
+    ruleset = ruleset or load_ruleset()
+    df = sort_sequences(df, by, order)
+    starts = group_starts(df[by])
+    states, _ = decay_scan(ruleset.weight_matrix(df, hit_cache), ruleset.decays, starts)
+    users = df[by].to_numpy()[starts]
+    return SequenceTrajectories(
+        users.tolist(), starts, df["cod_correcao_redacao"].to_numpy(), states, ruleset.skills
+    )
+
+
+def stack_states(
+    df: pd.DataFrame,
+    ruleset,
+    sequence_method: bool = False,
+    group_by: str = None,
+    hit_cache=None,
+    profile=None,
+):
+    """
+    Computes the stack after each row, as ``simulate_stack`` does.
+
+    Params:
+    df : pd.DataFrame
+        The essays, already in simulation order (sorted by ``group_by`` when given).
+    ruleset : CompiledRuleSet
+        The rules to be applied.
+    sequence_method : bool, optional
+        Whether the stack carries over between rows. Default is False (a new
+        stack per row).
+    group_by : str, optional
+        With ``sequence_method``, the column whose groups get their own stack.
+        Default is a single stack for all rows.
+    hit_cache : HitMatrixCache, optional
+        Reuses the rule masks already computed for the same data.
+    profile : SimulationProfile, optional
+        Receives the rule evaluation and stack update timings.
+
+    Returns:
+    np.ndarray
+        The N x skills matrix of stacks, with columns ordered as ``ruleset.skills``.
+    """
+    with profile_phase(profile, "avaliacao_regras"):
+        weight_matrix = ruleset.weight_matrix(df, hit_cache, profile)
+
+    with profile_phase(profile, "atualizacao_pilhas"):
+        if not sequence_method:
+            # Pilha nova a cada redação: o resultado é o próprio peso arredondado
+            return round_stack(weight_matrix)
+
+        starts = group_starts(df[group_by]) if group_by else None
+        states, _ = decay_scan(weight_matrix, ruleset.decays, starts)
+    return states
+
+
+def iter_state_blocks(
+    df: pd.DataFrame,
+    ruleset,
+    sequence_method: bool = False,
+    group_by: str = None,
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+    hit_cache=None,
+    profile=None,
+):
+    """
+    Computes the same stacks as ``stack_states`` in blocks of ``block_rows``
+    rows, yielding each block's states as soon as it is computed.
+
+    Only one block's weights and states exist at a time: in sequence mode the
+    stack of the sequence that crosses a block boundary is carried into the
+    next block, so memory is O(block_rows x skills) whatever the number of
+    rows. A frame that fits in one block is evaluated whole, with ``hit_cache``;
+    larger frames are evaluated block by block without it (the cache would
+    keep a mask per row).
+
+    Params:
+    df, ruleset, sequence_method, group_by, hit_cache, profile :
+        As in ``stack_states``.
+    block_rows : int, optional
+        The number of rows per block. Default is DEFAULT_BLOCK_ROWS.
+
+    Yields:
+    np.ndarray
+        The block_rows x skills matrix of stacks of each block, in row order.
+    """
+    if len(df) <= block_rows:
+        yield stack_states(df, ruleset, sequence_method, group_by, hit_cache, profile)
+        return
+
+    keys = df[group_by].to_numpy() if sequence_method and group_by else None
+    carried = None
+    for start in range(0, len(df), block_rows):
+        block = df.iloc[start:start + block_rows]
+        with profile_phase(profile, "avaliacao_regras"):
+            weights = ruleset.weight_matrix(block, None, profile)
+
+        with profile_phase(profile, "atualizacao_pilhas"):
+            if not sequence_method:
+                yield round_stack(weights)
+                continue
+
+            if keys is None:
+                starts, initial = None, carried
+            else:
+                block_keys = keys[start:start + block_rows]
+                starts = group_starts(block_keys)
+                initial = np.zeros((len(starts), len(ruleset.skills)), dtype=np.float64)
+                # A sequência que continua do bloco anterior parte da pilha em que ele parou
+                if carried is not None and block_keys[0] == keys[start - 1]:
+                    initial[0] = carried[-1]
+            states, carried = decay_scan(weights, ruleset.decays, starts, initial)
+        yield states
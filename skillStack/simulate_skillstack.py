@@ -1,50 +1,73 @@
 from skillStack.skill_stack import SkillStack
+from skillStack.rule_engine import DEFAULT_DECAY
+from skillStack.ruleset import load_ruleset
+from skillStack.sequence_engine import iter_state_blocks, sort_sequences, stack_states
+from skillStack.parallel import parallel_stack_states
+from skillStack.streaming import simulate_stack_stream
+from skillStack.hit_cache import HIT_CACHE
+from skillStack.profiling import SimulationProfile, profile_phase
+from skillStack.aggregation import StackSummary, top_skill_counts
+from skillStack.animation import animation_payload, frame_rows
 from typing import List, Union, Literal
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
-import json
+import time
 
 def _load_rules():
-    with open("rules.json", "r") as f:
-        loaded_rules = json.load(f)
-
-    # Reconstruir as lambdas
-    for rule in loaded_rules:
-        rule["regra"] = eval(rule["regra"])
-    return loaded_rules
+    # Regras compiladas uma única vez (cache invalidado quando o arquivo muda)
+    return list(load_ruleset().rules)
 
 # Função para verificar as regras
-def _check_rules(variables, rules):
+def _check_rules(variables, rules, profile=None):
+    # Com profile, registra também o tempo, o acerto e o erro de cada regra
     weights = {}
     decays = {}
-    for rule_dict in rules:
+    for position, rule_dict in enumerate(rules):
         rule_name = rule_dict["habilidade"]
         rule_func = rule_dict["regra"]
         rule_weight = rule_dict["peso"]
-        rule_decay = rule_dict["decaimento"]
+        rule_decay = rule_dict.get("decaimento", DEFAULT_DECAY)
         if not rule_name in weights:
             weights[rule_name] = 0
             decays[rule_name] = rule_decay
+        if profile is not None:
+            start = time.perf_counter()
+        hit = error = False
         try:
-            if rule_func(variables):
-                weights[rule_name] += rule_weight
+            hit = rule_func(variables)
         except TypeError:
-            pass
+            error = True
+        if profile is not None:
+            profile.record_rule(position, rule_dict, time.perf_counter() - start, bool(hit), error, "linha")
+        if hit:
+            weights[rule_name] += rule_weight
 
     return weights, decays
 
 
-def _mean_stack(stacks:List[dict]):
-    all_keys = set().union(*(d['stack_result'].keys() for d in stacks))
+def _simulate_rows(df, ruleset, sequence_method, groups=None, profile=None):
+    # Caminho original: avalia as regras e atualiza a pilha linha a linha
+    rules = ruleset.rules
+    skill_decays = dict(zip(ruleset.skills, ruleset.decays.tolist()))
+    stack = SkillStack()
+    groups = [None] * len(df) if groups is None else groups
+    previous_group = None
+    for row, group in zip(df.itertuples(index=False), groups):
+        if not sequence_method or group != previous_group:
+            stack = SkillStack()
+            previous_group = group
+
+        with profile_phase(profile, "avaliacao_regras"):
+            if profile is not None:
+                # O perfil avalia todas as regras para contar acertos e erros de cada uma
+                weights, _ = _check_rules(row._asdict(), rules, profile)
+            else:
+                weights = ruleset.row_weights(row._asdict())
+        with profile_phase(profile, "atualizacao_pilhas"):
+            stack.update(weights, skill_decays)
+        yield stack.stack
 
-    # Calcular a média considerando valores ausentes como 0
-    result = {}
-    for key in all_keys:
-        values = [d['stack_result'].get(key, 0) for d in stacks]  # Usa 0 para valores ausentes
-        #print(values)
-        result[key] = sum(values) / len(stacks)
-    
-    return result
 
 def simulate_stack(
     df_essays: Union[pd.DataFrame, str],
@@ -52,58 +75,192 @@ def simulate_stack(
     cods: List[int] = [],
     sequence_method: bool = False,
     show_n: int = 10,
-    output_type: Literal["xlsx", "csv", "print", "df", "stacks", "plot", "anim"] = "stacks",
+    output_type: Literal["xlsx", "csv", "print", "df", "stacks", "plot", "summary", "anim", "anim_json"] = "stacks",
     output_path: str = "output",
+    vectorized: bool = True,
+    group_by: str = None,
+    order_by: str = "dat_envio",
+    workers: int = 1,
+    chunksize: int = None,
+    use_hit_cache: bool = True,
+    profile: SimulationProfile = None,
+    max_frames: int = None,
+    top_k_skills: int = None,
 ) -> Union[None, dict, pd.DataFrame]:
-    RULES = _load_rules()
-    rules = new_rules + RULES
+    # Com profile, registra o tempo de cada fase e de cada regra (ver SimulationProfile)
+    with profile_phase(profile, "carregamento_regras"):
+        ruleset = load_ruleset().extend(new_rules)
+
+    # Modo streaming: lê o arquivo em blocos e grava o CSV incrementalmente
+    if chunksize:
+        if not isinstance(df_essays, str) or output_type != "csv":
+            raise ValueError("O modo streaming (chunksize) exige um caminho de arquivo e output_type='csv'.")
+        with profile_phase(profile, "streaming"):
+            written = simulate_stack_stream(
+                df_essays,
+                f"{output_path}.csv",
+                ruleset,
+                cods=cods or None,
+                sequence_method=sequence_method,
+                group_by=group_by,
+                chunksize=chunksize,
+            )
+        print(f"{written} resultados salvos em {output_path}.csv")
+        return
+
+    df = _prepare_essays(df_essays, cods, sequence_method, group_by, order_by, profile)
+
+    # Gráfico e resumo (vetorizado): pilhas calculadas e agregadas em blocos de linhas,
+    # sem montar a matriz de pesos nem a de pilhas do conjunto inteiro
+    if vectorized and workers <= 1 and output_type in ("plot", "summary"):
+        summary = StackSummary(ruleset.skills)
+        hit_cache = HIT_CACHE if use_hit_cache and profile is None else None
+        for states in iter_state_blocks(df, ruleset, sequence_method, group_by, hit_cache=hit_cache, profile=profile):
+            with profile_phase(profile, "saida"):
+                summary.update(states)
+        return summary if output_type == "summary" else mean_stack_figure(summary)
+
+    # Calcula as pilhas: de uma vez sobre todas as colunas ou linha a linha
+    if vectorized:
+        states = _stack_states(df, ruleset, sequence_method, group_by, workers, use_hit_cache, profile)
+    else:
+        groups = pd.factorize(df[group_by])[0] if group_by else None
+        stack_results = _simulate_rows(df, ruleset, sequence_method, groups, profile)
+        if profile is not None and output_type not in ("plot", "summary"):
+            # Consome o gerador aqui para não misturar as fases com a montagem da saída
+            stack_results = list(stack_results)
+
+    # Gráfico e resumo: só agregados por habilidade, sem guardar a pilha de cada linha
+    if output_type in ("plot", "summary"):
+        summary = StackSummary(ruleset.skills)
+        if vectorized:
+            # Caminho paralelo (workers > 1): as pilhas vêm de uma vez dos processos
+            with profile_phase(profile, "saida"):
+                summary.update(states)
+        else:
+            # O gerador registra as próprias fases enquanto é consumido
+            summary.update_stacks(stack_results)
+        return summary if output_type == "summary" else mean_stack_figure(summary)
+
+    # Animação: um quadro por redação, ou até max_frames redações amostradas quando
+    # informado (ex.: DEFAULT_MAX_FRAMES nas páginas); top_k_skills habilidades por quadro
+    if output_type in ("anim", "anim_json"):
+        with profile_phase(profile, "saida"):
+            frames = frame_rows(len(df), max_frames)
+            if vectorized:
+                frame_states = states[frames]
+            else:
+                selected = set(frames.tolist())
+                frame_states = [
+                    [stack.get(skill, 0.0) for skill in ruleset.skills]
+                    for idx, stack in enumerate(stack_results) if idx in selected
+                ]
+            payload = animation_payload(frame_states, ruleset.skills, frames + 1, top_k_skills)
+            return payload if output_type == "anim_json" else animation_figure(payload)
+
+    if vectorized:
+        stack_results = (dict(zip(ruleset.skills, state)) for state in states.tolist())
+    with profile_phase(profile, "saida"):
+        return _build_output(df, stack_results, output_type, output_path)
+
+
+def simulate_top_skills(
+    df_essays: Union[pd.DataFrame, str],
+    k: int = 1,
+    ties: bool = False,
+    by: Union[str, pd.Series] = None,
+    new_rules: List[dict] = [],
+    cods: List[int] = [],
+    sequence_method: bool = True,
+    group_by: str = None,
+    order_by: str = "dat_envio",
+    workers: int = 1,
+    use_hit_cache: bool = True,
+    profile: SimulationProfile = None,
+) -> Union[pd.Series, pd.DataFrame]:
+    """
+    Counts how many stacks have each skill in their top k, straight from the
+    stack matrix (no per-row dicts are built).
+
+    Params:
+    df_essays : pd.DataFrame or str
+        The essays, or the path of a .csv/.xlsx file.
+    k : int, optional
+        The number of top skills of each stack. Default is 1.
+    ties : bool, optional
+        Whether skills tied with the k-th value are also counted. If False, ties
+        are broken as ``sorted`` does on the stack dict. Default is False.
+    by : str or array-like, optional
+        A column of ``df_essays``, or values aligned with its rows (e.g. score
+        bands), to break the counts down by.
+    new_rules, cods, sequence_method, group_by, order_by, workers, use_hit_cache, profile : optional
+        As in ``simulate_stack``.
+
+    Returns:
+    pd.Series or pd.DataFrame
+        See ``top_skill_counts``.
+    """
+    with profile_phase(profile, "carregamento_regras"):
+        ruleset = load_ruleset().extend(new_rules)
+    if by is not None and not isinstance(by, (str, pd.Series)):
+        by = pd.Series(by, index=df_essays.index)
+    df = _prepare_essays(df_essays, cods, sequence_method, group_by, order_by, profile)
+    states = _stack_states(df, ruleset, sequence_method, group_by, workers, use_hit_cache, profile)
+
+    with profile_phase(profile, "saida"):
+        # Chaves na ordem das linhas simuladas (após filtro e ordenação)
+        by = df[by] if isinstance(by, str) else by.reindex(df.index) if by is not None else None
+        return top_skill_counts(states, ruleset.skills, k, ties, by)
 
+
+def _prepare_essays(df_essays, cods, sequence_method, group_by, order_by, profile=None):
     # Verifica se df_essays é uma string (caminho para arquivo)
     if isinstance(df_essays, str):
-        try:
-            if df_essays.endswith(".csv"):
-                df_essays = pd.read_csv(df_essays)
-            elif df_essays.endswith(".xlsx"):
-                df_essays = pd.read_excel(df_essays)
-            else:
-                raise ValueError("Formato de arquivo não suportado. Use .csv ou .xlsx")
-        except Exception as e:
-            raise ValueError(f"Erro ao ler o arquivo: {e}")
+        with profile_phase(profile, "leitura"):
+            try:
+                if df_essays.endswith(".csv"):
+                    df_essays = pd.read_csv(df_essays)
+                elif df_essays.endswith(".xlsx"):
+                    df_essays = pd.read_excel(df_essays)
+                else:
+                    raise ValueError("Formato de arquivo não suportado. Use .csv ou .xlsx")
+            except Exception as e:
+                raise ValueError(f"Erro ao ler o arquivo: {e}")
 
-    # Filtra os dados pelo código fornecido
-    if cods == []:
-        cods = df_essays["cod_correcao_redacao"].values
-    df = df_essays[df_essays["cod_correcao_redacao"].isin(cods)]
+    with profile_phase(profile, "filtro"):
+        # Filtra os dados pelo código fornecido
+        if cods == []:
+            cods = df_essays["cod_correcao_redacao"].values
+        df = df_essays[df_essays["cod_correcao_redacao"].isin(cods)]
 
-    # Inicializa a pilha de habilidades
-    stack = SkillStack()
-    output_data = []
-    animation_data = []
-    for idx, row in enumerate(df.itertuples(index=False), start=1):  # Usar índice sequencial
-        if not sequence_method:
-            stack = SkillStack()
+        # Uma pilha por grupo (ex.: cod_usuario), percorrendo as redações em ordem
+        if sequence_method and group_by:
+            df = sort_sequences(df, group_by, order_by)
+    return df
 
-        weights, decays = _check_rules(row._asdict(), rules)
-        stack.update(weights, decays)
-        stack_result = stack.stack
+
+def _stack_states(df, ruleset, sequence_method, group_by, workers, use_hit_cache, profile=None):
+    # Matriz de pilhas (linhas x habilidades) calculada de uma vez
+    if workers > 1:
+        with profile_phase(profile, "pilhas_paralelo"):
+            return parallel_stack_states(df, ruleset, sequence_method, group_by, workers)
+    # Reaproveita as máscaras de regras já avaliadas sobre os mesmos dados; com
+    # profile as regras são sempre avaliadas, para o tempo de cada uma ser medido
+    hit_cache = HIT_CACHE if use_hit_cache and profile is None else None
+    return stack_states(df, ruleset, sequence_method, group_by, hit_cache, profile)
+
+
+def _build_output(df, stack_results, output_type, output_path):
+    output_data = []
+    rows = zip(df["cod_correcao_redacao"], stack_results)
+    for cod, stack_result in rows:
         output_data.append(
             {
-                "cod_correcao_redacao": row.cod_correcao_redacao,
+                "cod_correcao_redacao": cod,
                 "stack_result": stack_result,
             }
         )
 
-        # Coleta dados para animação (apenas habilidades com valores > 0)
-        for skill, weight in stack_result.items():
-            if weight > 0:
-                animation_data.append(
-                    {
-                        "iteration": idx,  # Índice sequencial
-                        "skill": skill,
-                        "weight": weight,
-                    }
-                )
-
     # Processa a saída com base no tipo
     if output_type == "print":
         for item in output_data:
@@ -126,26 +283,84 @@ def simulate_stack(
     elif output_type == "stacks":
         return output_data
 
-    elif output_type == "plot":
-        df_plot = pd.DataFrame(list(_mean_stack(output_data).items()), columns=["Regra", "Peso"])
-        df_plot = df_plot.loc[df_plot['Peso'] > 0]
-        df_plot = df_plot.sort_values(by="Peso", ascending=False)
-        
-        # Criar o gráfico de barras com Plotly
-        fig = px.bar(df_plot, x="Regra", y="Peso", title="Pilha Média")
-        return fig
-
-    elif output_type == "anim":
-        df_anim = pd.DataFrame(animation_data)
-        df_anim = df_anim.sort_values(by=["iteration", "weight"], ascending=[True, False])
-        fig = px.bar(
-            df_anim,
-            x="skill",
-            y="weight",
-            color="skill",
-            animation_frame="iteration",
-            title="Evolução da Pilha ao Longo do Tempo",
-            labels={"iteration": "Redação", "weight": "Peso", "skill": "Habilidade"},
-            range_y=[0, 20],
+
+def mean_stack_figure(summary: StackSummary):
+    # Gráfico de barras da pilha média (habilidades com média > 0)
+    df_plot = summary.mean().rename_axis("Regra").reset_index(name="Peso")
+    df_plot = df_plot.loc[df_plot['Peso'] > 0]
+    df_plot = df_plot.sort_values(by="Peso", ascending=False, kind="stable")
+
+    # Criar o gráfico de barras com Plotly
+    fig = px.bar(df_plot, x="Regra", y="Peso", title="Pilha Média")
+    return fig
+
+
+def distribution_figure(summary: StackSummary):
+    # Mapa de calor com a distribuição dos pesos de cada habilidade acionada
+    stats = summary.to_frame()
+    active = stats.index[stats["positivas"] > 0]
+    hist = summary.histogram_frame().loc[active]
+    share = hist.div(max(summary.rows, 1)) * 100
+    fig = px.imshow(
+        share,
+        aspect="auto",
+        color_continuous_scale="Blues",
+        labels={"x": "Peso", "y": "Habilidade", "color": "% das redações"},
+        title="Distribuição dos Pesos por Habilidade",
+    )
+    return fig
+
+
+def animate_trajectory(trajectory: pd.DataFrame, max_frames: int = None, top_k_skills: int = None):
+    # Animação da pilha de um usuário (uma linha por redação, uma coluna por habilidade);
+    # com max_frames, no máximo esse número de redações amostradas
+    frames = frame_rows(len(trajectory), max_frames)
+    payload = animation_payload(trajectory.to_numpy()[frames], list(trajectory.columns), frames + 1, top_k_skills)
+    return animation_figure(payload)
+
+
+def animation_figure(payload: dict):
+    # Gráfico animado a partir do payload compacto de animation_payload: um
+    # único traço de barras por quadro (px.bar criaria um traço por habilidade)
+    skills = payload["skills"]
+    palette = px.colors.qualitative.Plotly
+    colors = [palette[i % len(palette)] for i in range(len(skills))]
+
+    frames = []
+    for iteration, top, weights in zip(payload["iterations"], payload["top"], payload["weights"]):
+        shown = [(skills[i], colors[i], w) for i, w in zip(top, weights) if i >= 0]
+        frames.append(
+            go.Frame(
+                name=str(iteration),
+                data=[go.Bar(
+                    x=[skill for skill, _, _ in shown],
+                    y=[w for _, _, w in shown],
+                    marker_color=[color for _, color, _ in shown],
+                    hovertemplate="Habilidade=%{x}<br>Peso=%{y}<extra></extra>",
+                )],
+            )
         )
-        return fig
\ No newline at end of file
+
+    fig = go.Figure(data=frames[0].data if frames else [go.Bar()], frames=frames)
+    fig.update_layout(
+        title="Evolução da Pilha ao Longo do Tempo",
+        xaxis_title="Habilidade",
+        yaxis_title="Peso",
+        yaxis_range=payload["range_y"],
+        updatemenus=[{
+            "type": "buttons",
+            "showactive": False,
+            "buttons": [
+                {"label": "▶", "method": "animate", "args": [None, {"frame": {"duration": 500, "redraw": True}, "fromcurrent": True}]},
+                {"label": "◼", "method": "animate", "args": [[None], {"frame": {"duration": 0, "redraw": False}, "mode": "immediate"}]},
+            ],
+        }],
+        sliders=[{
+            "currentvalue": {"prefix": "Redação="},
+            "steps": [
+                {"label": frame.name, "method": "animate", "args": [[frame.name], {"frame": {"duration": 0, "redraw": True}, "mode": "immediate"}]}
+                for frame in frames
+            ],
+        }],
+    )
+    return fig
@@ -3,6 +3,8 @@ import warnings
 from dataclasses import dataclass
 from heapq import nlargest
 
+from skillStack.stack_store import StackStore
+
 
 @dataclass
 class SkillStack:
@@ -10,6 +12,7 @@ class SkillStack:
     json_stack_path: str = "skill_stack.json"
     json_stack_template_path: str = "skill_stack.json.template"
     forget_weight: float = 0.5
+    store: StackStore = None
 
     def __post_init__(self):
         if self.stack_id:
@@ -31,8 +34,16 @@ class SkillStack:
 
         Raises:
         IndexError
-            If the stack with the specified ID is not found in the JSON file.
+            If the stack with the specified ID is not found in the store (or in
+            the JSON file when there is no store).
         """
+        if self.store is not None:
+            stack = self.store.load(stack_id)
+            if stack is None:
+                raise IndexError(f"Stack of id ({stack_id}) not found on {self.store.path}")
+            self.stack = stack
+            return
+
         try:
             with open(self.json_stack_path, "r") as f:
                 self.stack = json.load(f)[str(stack_id)]
@@ -95,6 +106,49 @@ class SkillStack:
             key: self.stack[key] * (1 - decays[key]) for key in self.stack
         }
 
+    def save(self):
+        """
+        Saves the current stack to the store, or to the JSON file when there is
+        no store.
+        """
+        if self.store is not None:
+            self.store.save(self.stack_id, self.stack)
+        else:
+            self.to_jsonfile()
+
+    @classmethod
+    def load_many(cls, stack_ids, store: StackStore, **kwargs):
+        """
+        Loads many stacks with a single read of the store.
+
+        Params:
+        stack_ids : iterable
+            The IDs of the stacks to be loaded.
+        store : StackStore
+            The store the stacks are read from.
+
+        Returns:
+        dict
+            The loaded SkillStack instances by stack_id; IDs not found in the
+            store get a new, empty stack.
+        """
+        stack_ids = list(stack_ids)
+        stored = store.load_many(stack_ids)
+        stacks = {}
+        for stack_id in stack_ids:
+            stack = cls(store=store, **kwargs)
+            stack.stack_id = stack_id
+            stack.stack = dict(stored.get(str(stack_id), {}))
+            stacks[stack_id] = stack
+        return stacks
+
+    @staticmethod
+    def save_many(stacks, store: StackStore):
+        """
+        Saves many SkillStack instances with a single write to the store.
+        """
+        store.save_many({stack.stack_id: stack.stack for stack in stacks})
+
     def to_jsonfile(self):
         """
         Saves the current stack to the JSON file, updating or creating the entry
@@ -0,0 +1,233 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from skillStack.skill_stack import SkillStack
+
+
+class StackMatrix:
+    """
+    Skill stacks of many users kept as rows of a single float64 matrix.
+
+    The columns follow a fixed skill index (usually ``CompiledRuleSet.skills``),
+    so decay and weight addition for thousands of users are a single vectorized
+    step. ``view`` exposes one row through the ``SkillStack`` API.
+    """
+
+    def __init__(self, skills, decays, capacity: int = 1024):
+        self.skills = list(skills)
+        self.skill_index = {skill: i for i, skill in enumerate(self.skills)}
+        self.decays = np.asarray(decays, dtype=np.float64)
+        self.values = np.zeros((max(capacity, 1), len(self.skills)), dtype=np.float64)
+        self.touched = np.zeros(len(self.values), dtype=bool)
+        self.row_of = {}
+
+    @classmethod
+    def from_ruleset(cls, ruleset, capacity: int = 1024):
+        """
+        Creates an empty matrix with the skills and decays of a CompiledRuleSet.
+        """
+        return cls(ruleset.skills, ruleset.decays, capacity)
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def __contains__(self, user):
+        return user in self.row_of
+
+    def rows(self, users):
+        """
+        Returns the matrix rows of the given users, allocating rows for new ones.
+        """
+        rows = np.empty(len(users), dtype=np.intp)
+        for i, user in enumerate(users):
+            row = self.row_of.get(user)
+            if row is None:
+                row = self.row_of[user] = len(self.row_of)
+            rows[i] = row
+        self._reserve(len(self.row_of))
+        return rows
+
+    def update(self, users, weights, decays=None):
+        """
+        Applies ``SkillStack.update`` to many users at once.
+
+        A user may appear more than once; its updates are applied in the given
+        order, so this also replays whole sequences.
+
+        Params:
+        users : sequence
+            The user of each weights row.
+        weights : np.ndarray
+            A len(users) x skills matrix with the weights to be added.
+        decays : np.ndarray, optional
+            The decay of each skill. Default is the matrix's decays.
+
+        Returns:
+        np.ndarray
+            A len(users) x skills matrix with the stack of each user right after
+            each of its updates.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        retention = 1 - (self.decays if decays is None else np.asarray(decays))
+        rows = self.rows(users)
+        result = np.empty_like(weights)
+
+        for wave in _occurrence_waves(rows):
+            wave_rows = rows[wave]
+            values = round_stack(self.values[wave_rows] * retention + weights[wave])
+            self.values[wave_rows] = values
+            result[wave] = values
+        self.touched[rows] = True
+        return result
+
+    def forget(self, users, decays=None):
+        """
+        Applies only the decay step to the stacks of the given (distinct) users.
+        """
+        retention = 1 - (self.decays if decays is None else np.asarray(decays))
+        rows = self.rows(users)
+        self.values[rows] *= retention
+
+    def greater(self, user, n: int = 1):
+        """
+        Returns the n skills with the highest values in a user's stack, with the
+        same order and tie-breaking as ``SkillStack.greater``.
+        """
+        row = self.row_of.get(user)
+        if row is None or not self.touched[row]:
+            return []
+        return [self.skills[i] for i in top_k(self.values[row], n)]
+
+    def stack(self, user):
+        """
+        Returns a user's stack as a dict, like ``SkillStack.stack``.
+        """
+        row = self.row_of.get(user)
+        if row is None or not self.touched[row]:
+            return {}
+        return dict(zip(self.skills, self.values[row].tolist()))
+
+    def set_stack(self, user, stack: dict):
+        """
+        Overwrites a user's stack with the values of a dict.
+        """
+        row = self.rows([user])[0]
+        self.values[row] = self.vector(stack)
+        self.touched[row] = bool(stack)
+
+    def vector(self, values: dict):
+        """
+        Converts a skill -> value dict to a row in the matrix's skill order.
+        """
+        vector = np.zeros(len(self.skills), dtype=np.float64)
+        for skill, value in values.items():
+            vector[self.skill_index[skill]] = value
+        return vector
+
+    def view(self, user):
+        """
+        Returns a SkillStack bound to a user's row.
+        """
+        return MatrixSkillStack(stack_id=user, backend=self)
+
+    def _reserve(self, size):
+        if size <= len(self.values):
+            return
+        capacity = max(size, 2 * len(self.values))
+        values = np.zeros((capacity, len(self.skills)), dtype=np.float64)
+        values[: len(self.values)] = self.values
+        touched = np.zeros(capacity, dtype=bool)
+        touched[: len(self.touched)] = self.touched
+        self.values, self.touched = values, touched
+
+
+@dataclass
+class MatrixSkillStack(SkillStack):
+    """
+    A SkillStack whose state lives in a row of a StackMatrix.
+    """
+
+    backend: StackMatrix = None
+
+    def __post_init__(self):
+        if self.backend is None:
+            raise ValueError("MatrixSkillStack precisa de um StackMatrix.")
+
+    @property
+    def stack(self):
+        return self.backend.stack(self.stack_id)
+
+    @stack.setter
+    def stack(self, value):
+        self.backend.set_stack(self.stack_id, value)
+
+    def create_stack(self):
+        self.stack = {}
+
+    def update(self, weights: dict, decays: dict):
+        self.backend.update(
+            [self.stack_id],
+            self.backend.vector(weights)[None],
+            self.backend.vector(decays),
+        )
+
+    def greater(self, n: int = 1):
+        return self.backend.greater(self.stack_id, n)
+
+    def _forget(self, decays):
+        self.backend.forget([self.stack_id], self.backend.vector(decays))
+
+
+def round_stack(values: np.ndarray, decimals: int = 2):
+    """
+    Rounds like the builtin ``round`` used by ``SkillStack.update``.
+
+    ``np.round`` scales by 10**decimals before rounding, which moves values that
+    sit next to a tie (e.g. 1.405) to the other side; those few values are
+    rounded with the builtin instead.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.round(values, decimals)
+    scaled = values * 10**decimals
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        result[near_tie] = [round(value, decimals) for value in values[near_tie].tolist()]
+    return result
+
+
+def top_k(values: np.ndarray, n: int):
+    """
+    Returns the indices of the n highest values, highest first, breaking ties
+    by the lowest index (the order ``heapq.nlargest`` gives for a dict).
+    """
+    size = len(values)
+    n = min(n, size)
+    if n <= 0:
+        return []
+    threshold = np.partition(values, size - n)[size - n]
+    above = np.flatnonzero(values > threshold)
+    ties = np.flatnonzero(values == threshold)[: n - len(above)]
+    candidates = np.concatenate([above, ties])
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order].tolist()
+
+
+def _occurrence_waves(rows):
+    """
+    Splits positions into waves where each row appears at most once, keeping the
+    order of repeated rows (the k-th occurrence of a row goes to wave k).
+    """
+    if len(rows) == 0:
+        return []
+    order = np.argsort(rows, kind="stable")
+    sorted_rows = rows[order]
+    starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    occurrence = np.empty(len(rows), dtype=np.intp)
+    occurrence[order] = np.arange(len(rows)) - group_start
+    if occurrence.max() == 0:
+        return [np.arange(len(rows))]
+    by_wave = np.argsort(occurrence, kind="stable")
+    bounds = np.searchsorted(occurrence[by_wave], np.arange(occurrence.max() + 2))
+    return [by_wave[bounds[k]: bounds[k + 1]] for k in range(occurrence.max() + 1)]
@@ -0,0 +1,195 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+# Limite de parâmetros por consulta das versões antigas do SQLite
+_SQLITE_BATCH = 900
+
+
+class StackStore(ABC):
+    """
+    Persistence backend of ``SkillStack``: stacks (skill -> value dicts) keyed
+    by stack id. Ids are stored as strings, as in ``skill_stack.json``.
+    Backends implement ``load_many``, ``save_many`` and ``items``.
+    """
+
+    def load(self, stack_id):
+        """
+        Returns the stack of ``stack_id``, or None if it is not stored.
+        """
+        return self.load_many([stack_id]).get(str(stack_id))
+
+    def save(self, stack_id, stack: dict):
+        """
+        Stores the stack of ``stack_id``, replacing the previous one.
+        """
+        self.save_many({stack_id: stack})
+
+    @abstractmethod
+    def load_many(self, stack_ids):
+        """
+        Returns a dict from id (as a string) to stack with the stored stacks
+        among ``stack_ids``.
+        """
+
+    @abstractmethod
+    def save_many(self, stacks: dict):
+        """
+        Stores several stacks (id -> stack) at once.
+        """
+
+    @abstractmethod
+    def items(self):
+        """
+        Iterates over every stored (id, stack) pair.
+        """
+
+    def close(self):
+        pass
+
+
+class JsonStackStore(StackStore):
+    """
+    The original format: a single JSON file with every stack. Each load parses
+    and each save rewrites the whole file; kept for compatibility and to
+    migrate to ``SqliteStackStore`` (see ``copy_stacks``).
+    """
+
+    def __init__(self, path: str = "skill_stack.json"):
+        self.path = path
+
+    def load_many(self, stack_ids):
+        stacks = self._read()
+        return {str(i): stacks[str(i)] for i in stack_ids if str(i) in stacks}
+
+    def save_many(self, stacks: dict):
+        stored = self._read()
+        stored.update({str(i): stack for i, stack in stacks.items()})
+        with open(self.path, "w") as f:
+            json.dump(stored, f, indent=4)
+
+    def items(self):
+        return iter(self._read().items())
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+
+class SqliteStackStore(StackStore):
+    """
+    Stacks in a SQLite table with one row per (stack id, skill), clustered by
+    the primary key: loading or saving one stack touches only its rows,
+    whatever the number of stored stacks. The position of each skill keeps the
+    dict order (which breaks ties in ``SkillStack.greater``). An empty stack
+    has no rows, so it loads as not stored.
+
+    Each thread gets its own connection; in WAL mode reads (e.g. cache misses)
+    are not blocked by a write in progress in another thread.
+    """
+
+    def __init__(self, path: str = "skill_stack.db"):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._connection().execute(
+            """
+            CREATE TABLE IF NOT EXISTS stacks (
+                stack_id TEXT NOT NULL,
+                skill TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (stack_id, skill)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def load_many(self, stack_ids):
+        ids = list(dict.fromkeys(str(i) for i in stack_ids))
+        stacks = {}
+        conn = self._connection()
+        for start in range(0, len(ids), _SQLITE_BATCH):
+            batch = ids[start:start + _SQLITE_BATCH]
+            rows = conn.execute(
+                f"SELECT stack_id, skill, value FROM stacks WHERE stack_id IN ({','.join('?' * len(batch))})"
+                " ORDER BY stack_id, position",
+                batch,
+            )
+            for stack_id, skill, value in rows:
+                stacks.setdefault(stack_id, {})[skill] = value
+        return stacks
+
+    def save_many(self, stacks: dict):
+        ids = [(str(i),) for i in stacks]
+        rows = [
+            (str(i), skill, position, float(value))
+            for i, stack in stacks.items()
+            for position, (skill, value) in enumerate(stack.items())
+        ]
+        conn = self._connection()
+        # Uma transação por lote: a pilha antiga sai inteira (pode ter outras habilidades)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM stacks WHERE stack_id = ?", ids)
+            conn.executemany("INSERT INTO stacks VALUES (?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def items(self):
+        # O cursor é percorrido enquanto as linhas chegam (já agrupadas pela chave
+        # primária): só a pilha atual fica em memória, não a tabela inteira
+        rows = self._connection().execute("SELECT stack_id, skill, value FROM stacks ORDER BY stack_id, position")
+        current_id, current = None, None
+        for stack_id, skill, value in rows:
+            if stack_id != current_id:
+                if current_id is not None:
+                    yield current_id, current
+                current_id, current = stack_id, {}
+            current[skill] = value
+        if current_id is not None:
+            yield current_id, current
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Conexões só são usadas pela thread que as criou; close pode vir de outra
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+
+def copy_stacks(source: StackStore, target: StackStore, batch: int = 10_000):
+    """
+    Copies every stack of ``source`` into ``target`` in batches (e.g. to
+    migrate ``skill_stack.json`` to SQLite). Returns the number of stacks.
+    """
+    count = 0
+    pending = {}
+    for stack_id, stack in source.items():
+        pending[stack_id] = stack
+        if len(pending) == batch:
+            target.save_many(pending)
+            count += len(pending)
+            pending = {}
+    if pending:
+        target.save_many(pending)
+        count += len(pending)
+    return count
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+
+from skillStack.ruleset import load_ruleset
+from skillStack.sequence_engine import decay_scan, stack_states
+from skillStack.stack_matrix import StackMatrix
+from utils.load_data import iter_chunks
+
+
+def simulate_stack_stream(
+    input_path: str,
+    output_path: str,
+    ruleset=None,
+    cods=None,
+    sequence_method: bool = False,
+    group_by: str = None,
+    chunksize: int = 100_000,
+):
+    """
+    Simulates the stacks of a CSV/Parquet file chunk by chunk, appending the
+    results to a CSV as they are computed.
+
+    Peak memory is proportional to the chunk size plus, with ``group_by``, one
+    stack per active user: per-user state is kept in a StackMatrix and carried
+    across chunk boundaries. Since the file is never fully loaded it cannot be
+    sorted, so in sequence mode each user's essays must already be in
+    submission order in the file (users may be interleaved).
+
+    Params:
+    input_path : str
+        A ``.csv`` or ``.parquet`` file with the essays.
+    output_path : str
+        The CSV to be written, with the input columns plus ``pilha``, in the
+        same format as ``simulate_stack(..., output_type="csv")``.
+    ruleset : CompiledRuleSet, optional
+        The rules to be applied. Default is the ruleset in ``rules.json``.
+    cods : list, optional
+        Only essays with these ``cod_correcao_redacao`` are simulated.
+    sequence_method : bool, optional
+        Whether the stack carries over between essays. Default is False.
+    group_by : str, optional
+        With ``sequence_method``, the column whose groups get their own stack.
+        Default is a single stack for the whole file.
+    chunksize : int, optional
+        The number of rows read at a time. Default is 100000.
+
+    Returns:
+    int
+        The number of rows written.
+    """
+    ruleset = ruleset or load_ruleset()
+    stacks = StackMatrix.from_ruleset(ruleset)
+    single_stack = np.zeros((1, len(ruleset.skills)), dtype=np.float64)
+
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    written = 0
+    for chunk in iter_chunks(input_path, chunksize):
+        if cods is not None:
+            chunk = chunk[chunk["cod_correcao_redacao"].isin(cods)]
+        if chunk.empty:
+            continue
+
+        if not sequence_method:
+            states = stack_states(chunk, ruleset)
+        elif group_by:
+            states = stacks.update(chunk[group_by].tolist(), ruleset.weight_matrix(chunk))
+        else:
+            states, single_stack = decay_scan(
+                ruleset.weight_matrix(chunk), ruleset.decays, initial=single_stack
+            )
+
+        chunk = chunk.assign(
+            pilha=[
+                {"cod_correcao_redacao": cod, "stack_result": dict(zip(ruleset.skills, state))}
+                for cod, state in zip(chunk["cod_correcao_redacao"], states.tolist())
+            ]
+        )
+        chunk.to_csv(output_path, mode="a", header=written == 0, index=False)
+        written += len(chunk)
+
+    return written
@@ -0,0 +1,211 @@
+import itertools
+from dataclasses import dataclass
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+
+from skillStack.aggregation import top_skill_mask
+from skillStack.hit_cache import HitMatrixCache
+from skillStack.ruleset import CompiledRuleSet, load_ruleset
+from skillStack.sequence_engine import decay_scan, group_starts
+from skillStack.simulate_skillstack import _prepare_essays
+from skillStack.stack_matrix import round_stack
+
+# Memória aproximada de pesos + pilhas de um lote de configurações
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+
+def grid_configs(peso: dict = None, decaimento: dict = None):
+    """
+    Returns every combination of the given values (a cartesian grid).
+
+    Params:
+    peso : dict, optional
+        Skill -> list of weights. The weight replaces the ``peso`` of every rule
+        of the skill.
+    decaimento : dict, optional
+        Skill -> list of decays.
+
+    Returns:
+    list
+        One ``{"peso": {...}, "decaimento": {...}}`` config per combination.
+    """
+    axes = [("peso", skill, values) for skill, values in (peso or {}).items()]
+    axes += [("decaimento", skill, values) for skill, values in (decaimento or {}).items()]
+    configs = []
+    for combination in itertools.product(*(values for _, _, values in axes)):
+        config = {"peso": {}, "decaimento": {}}
+        for (kind, skill, _), value in zip(axes, combination):
+            config[kind][skill] = value
+        configs.append(config)
+    return configs
+
+
+def random_configs(n: int, peso: dict = None, decaimento: dict = None, seed: int = 42):
+    """
+    Returns ``n`` configs drawn uniformly from the given ranges.
+
+    Params:
+    n : int
+        The number of configs.
+    peso : dict, optional
+        Skill -> ``(low, high)``. Integer bounds draw integer weights
+        (inclusive), otherwise floats.
+    decaimento : dict, optional
+        Skill -> ``(low, high)`` decay range.
+    seed : int, optional
+        The random seed. Default is 42.
+    """
+    rng = np.random.default_rng(seed)
+    configs = [{"peso": {}, "decaimento": {}} for _ in range(n)]
+    for skill, (low, high) in (peso or {}).items():
+        if isinstance(low, (int, np.integer)) and isinstance(high, (int, np.integer)):
+            values = rng.integers(low, high + 1, n).tolist()
+        else:
+            values = rng.uniform(low, high, n).tolist()
+        for config, value in zip(configs, values):
+            config["peso"][skill] = value
+    for skill, (low, high) in (decaimento or {}).items():
+        for config, value in zip(configs, rng.uniform(low, high, n).tolist()):
+            config["decaimento"][skill] = value
+    return configs
+
+
+@dataclass
+class SweepResult:
+    configs: list
+    skills: list
+    rows: int
+    mean: pd.DataFrame
+    top1: pd.DataFrame
+
+    def summary(self):
+        """
+        Returns one row per config with its settings (``peso:<skill>`` and
+        ``decaimento:<skill>`` columns), the skill most often in the top 1, the
+        share of stacks where it is, and the mean total of the stacks.
+        """
+        settings = pd.DataFrame(
+            [
+                {
+                    **{f"peso:{skill}": value for skill, value in config.get("peso", {}).items()},
+                    **{f"decaimento:{skill}": value for skill, value in config.get("decaimento", {}).items()},
+                }
+                for config in self.configs
+            ],
+            index=self.mean.index,
+        )
+        top = self.top1.to_numpy()
+        leader = top.argmax(axis=1) if len(self.skills) else np.zeros(len(top), dtype=np.intp)
+        metrics = pd.DataFrame(
+            {
+                "top1": np.asarray(self.skills, dtype=object)[leader] if len(self.skills) else None,
+                "top1_fracao": top[np.arange(len(top)), leader] / max(self.rows, 1) if len(self.skills) else 0.0,
+                "pilha_media": self.mean.sum(axis=1),
+            },
+            index=self.mean.index,
+        )
+        return pd.concat([settings, metrics], axis=1)
+
+
+def simulate_sweep(
+    df_essays: Union[pd.DataFrame, str],
+    configs: List[dict],
+    cods: List[int] = [],
+    sequence_method: bool = True,
+    group_by: str = None,
+    order_by: str = "dat_envio",
+    ruleset=None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+):
+    """
+    Simulates many weight/decay configurations over the same essays.
+
+    The rules are evaluated once: the per-skill weight column and the per-skill
+    number of rule hits are computed a single time, and each config's weight
+    matrix is built from them (an overridden ``peso`` times the hits). Configs
+    are then stacked side by side as extra columns, so one ``decay_scan`` runs
+    a whole batch of configs; batches are sized to stay within ``max_bytes``.
+
+    Params:
+    df_essays : pd.DataFrame or str
+        The essays, or the path of a .csv/.xlsx file.
+    configs : list
+        Dicts with optional ``peso`` (skill -> weight of each of its rules) and
+        ``decaimento`` (skill -> decay) overrides; see ``grid_configs`` and
+        ``random_configs``. An empty dict is the current rules.
+    cods, sequence_method, group_by, order_by : optional
+        As in ``simulate_top_skills``.
+    ruleset : CompiledRuleSet, optional
+        The rules to be applied. Default is the ruleset in ``rules.json``.
+    max_bytes : int, optional
+        The approximate memory of a batch of configs. Default is 512 MB.
+
+    Returns:
+    SweepResult
+        Per config (one row each, in order): ``mean``, the mean stack of each
+        skill, and ``top1``, how many stacks have each skill as their top 1
+        (ties broken as in ``simulate_top_skills``).
+
+    Raises:
+    ValueError
+        If a config names a skill that is not in the rules.
+    """
+    ruleset = ruleset or load_ruleset()
+    skills = ruleset.skills
+    size = len(skills)
+    for config in configs:
+        unknown = set(config.get("peso", {})) | set(config.get("decaimento", {}))
+        unknown -= set(skills)
+        if unknown:
+            raise ValueError(f"Habilidades inexistentes nas regras: {', '.join(sorted(unknown))}")
+
+    df = _prepare_essays(df_essays, cods, sequence_method, group_by, order_by)
+    n_rows = len(df)
+
+    # As regras são avaliadas uma vez; a segunda matriz reaproveita as máscaras do cache
+    hit_cache = HitMatrixCache(max_datasets=1)
+    base = hit_cache.weight_matrix(df, ruleset)
+    hits = None
+    if any(config.get("peso") for config in configs):
+        unit = CompiledRuleSet([{**rule, "peso": 1} for rule in ruleset.rules], ruleset.version)
+        hits = hit_cache.weight_matrix(df, unit)
+    starts = group_starts(df[group_by]) if sequence_method and group_by else None
+
+    batch = max(1, max_bytes // max(2 * n_rows * size * 8, 1))
+    means, top1 = [], []
+    for first in range(0, len(configs), batch):
+        chunk = configs[first:first + batch]
+        weights = np.empty((n_rows, len(chunk), size), dtype=np.float64)
+        decays = np.empty((len(chunk), size), dtype=np.float64)
+        for j, config in enumerate(chunk):
+            weights[:, j] = base
+            for skill, value in config.get("peso", {}).items():
+                i = ruleset.skill_index[skill]
+                weights[:, j, i] = hits[:, i] * value
+            decays[j] = ruleset.decays
+            for skill, value in config.get("decaimento", {}).items():
+                decays[j, ruleset.skill_index[skill]] = value
+
+        # Cada configuração ocupa um bloco de colunas: o mesmo scan serve para todas
+        weights = weights.reshape(n_rows, len(chunk) * size)
+        if sequence_method:
+            states, _ = decay_scan(weights, decays.ravel(), starts)
+        else:
+            states = round_stack(weights)
+        states = states.reshape(n_rows, len(chunk), size)
+
+        means.append(states.sum(axis=0) / max(n_rows, 1))
+        mask = top_skill_mask(states.reshape(n_rows * len(chunk), size), k=1)
+        top1.append(mask.reshape(n_rows, len(chunk), size).sum(axis=0))
+
+    index = pd.RangeIndex(len(configs), name="config")
+    empty = np.zeros((0, size))
+    return SweepResult(
+        configs=list(configs),
+        skills=list(skills),
+        rows=n_rows,
+        mean=pd.DataFrame(np.concatenate(means) if means else empty, index=index, columns=skills),
+        top1=pd.DataFrame(np.concatenate(top1) if top1 else empty.astype(np.int64), index=index, columns=skills),
+    )
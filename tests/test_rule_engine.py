@@ -0,0 +1,81 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from skillStack.rule_engine import UnsupportedRule, compile_row_rule, compile_rule, migrate_rule, validate_rule
+from skillStack.ruleset import load_ruleset
+from utils.synthetic_data import synthetic_essays
+
+LEGACY_RULES = os.path.join(os.path.dirname(__file__), "data", "legacy_rules.json")
+
+
+def _row_hits(func, rows):
+    # Como _check_rules: a regra que lança TypeError não se aplica
+    hits = np.zeros(len(rows), dtype=bool)
+    for i, row in enumerate(rows):
+        try:
+            hits[i] = bool(func(row))
+        except TypeError:
+            pass
+    return hits
+
+
+@pytest.fixture(scope="module")
+def essays():
+    df = synthetic_essays(20_000)
+    return df, df.to_dict("records")
+
+
+def test_migrated_rules_hit_the_same_rows_as_the_legacy_lambdas(essays):
+    df, rows = essays
+    with open(LEGACY_RULES) as f:
+        legacy = json.load(f)
+    rules = load_ruleset().rules
+    assert len(rules) == len(legacy)
+
+    for old, new in zip(legacy, rules):
+        assert old["habilidade"] == new["habilidade"] and old["peso"] == new["peso"]
+        assert migrate_rule(old["regra"]) == new["fonte"]
+        # Referência: as strings antigas como eram executadas antes (eval)
+        expected = _row_hits(eval(old["regra"]), rows)
+        # Os dados sintéticos acionam todas as regras: a comparação não é trivial
+        assert expected.any(), new["fonte"]
+        assert np.array_equal(_row_hits(compile_row_rule(new["fonte"]), rows), expected), new["fonte"]
+        assert np.array_equal(compile_rule(new["fonte"])(df), expected), new["fonte"]
+
+
+def test_invert_is_logical_negation(essays):
+    df, rows = essays
+    positive = _row_hits(compile_row_rule("cod_condicional == 9"), rows)
+    negated = "~(cod_condicional == 9)"
+    assert np.array_equal(_row_hits(compile_row_rule(negated), rows), ~positive)
+    assert np.array_equal(compile_rule(negated)(df), ~positive)
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        # Acesso a atributos
+        "cod_condicional.__class__ == 1",
+        "lambda vars: vars.__class__ == 1",
+        "lambda vars: vars.get('cod_condicional').real == 1",
+        # Chamadas
+        "len(cod_condicional) > 1",
+        "__import__('os').system('true') == 0",
+        "lambda vars: vars.get('cod_condicional') == int('9')",
+        # in com algo que não é uma lista de constantes
+        "cod_condicional in num_pontuacao_eixo_2",
+        "cod_condicional in [num_pontuacao_eixo_2]",
+        "lambda vars: vars.get('cod_condicional') in vars.get('num_pontuacao_eixo_2')",
+        # lambda com dois parâmetros
+        "lambda vars, other: vars.get('cod_condicional') == 9",
+    ],
+)
+def test_rules_outside_the_language_are_rejected(source):
+    with pytest.raises(UnsupportedRule):
+        compile_row_rule(source)
+    with pytest.raises(UnsupportedRule):
+        validate_rule(source)
+    assert compile_rule(source) is None
@@ -0,0 +1,112 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from skillStack.ruleset import load_ruleset
+from skillStack.scoring_api import ARROW_TYPE, _parse_job, score_jobs
+from skillStack.simulate_skillstack import simulate_stack
+from utils.synthetic_data import synthetic_essays
+
+
+@pytest.fixture(scope="module")
+def essays():
+    # Linhas embaralhadas: a API recebe as redações fora da ordem de envio
+    return synthetic_essays(2_000, essays_per_user=4).sample(frac=1, random_state=3).reset_index(drop=True)
+
+
+def _expected_stacks(df, ruleset, **kwargs):
+    # simulate_stack devolve as linhas ordenadas; reindexa pela ordem enviada
+    output = simulate_stack(df, output_type="stacks", **kwargs)
+    by_cod = {item["cod_correcao_redacao"]: item["stack_result"] for item in output}
+    return np.array([[by_cod[cod][skill] for skill in ruleset.skills] for cod in df["cod_correcao_redacao"]])
+
+
+def _json_job(payload):
+    return _parse_job("application/json", json.dumps(payload).encode(), {})
+
+
+@pytest.mark.parametrize(
+    "payload, message",
+    [
+        ([1, 2], "objeto JSON"),
+        ({"rows": {"a": 1}}, "'rows'"),
+        ({"rows": [1, 2]}, "'rows'"),
+        ({"rows": [{"a": 1}], "output": "pilhas"}, "'output'"),
+        ({"rows": [{"a": 1}], "k": 0}, "'k'"),
+        ({"rows": [{"a": 1}], "group_by": "cod_usuario"}, "agrupamento"),
+    ],
+)
+def test_parse_job_rejects_invalid_requests(payload, message):
+    with pytest.raises(ValueError, match=message):
+        _json_job(payload)
+
+
+def test_parse_job_reads_json_and_arrow(essays):
+    rows = essays.head(5)
+    job = _json_job({"rows": rows.to_dict("records"), "output": "top", "k": 2, "sequence_method": True, "group_by": "cod_usuario"})
+    assert (job.output, job.k, job.sequence_method, job.group_by, job.order_by) == ("top", 2, True, "cod_usuario", "dat_envio")
+    assert len(job.df) == 5
+
+    pa = pytest.importorskip("pyarrow")
+    sink = io.BytesIO()
+    table = pa.Table.from_pandas(rows, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    query = {"output": ["top"], "k": ["3"], "sequence_method": ["true"], "group_by": ["cod_usuario"]}
+    job = _parse_job(ARROW_TYPE, sink.getvalue(), query)
+    assert (job.output, job.k, job.sequence_method, job.group_by) == ("top", 3, True, "cod_usuario")
+    pd.testing.assert_frame_equal(job.df, rows.reset_index(drop=True))
+
+
+@pytest.mark.parametrize(
+    "sequence_method, group_by",
+    [(False, None), (True, None), (True, "cod_usuario")],
+)
+def test_score_jobs_matches_simulate_stack(essays, sequence_method, group_by):
+    ruleset = load_ruleset()
+    # Vários jobs no mesmo lote, cada um com as linhas fora de ordem
+    parts = [essays.iloc[:700], essays.iloc[700:1500], essays.iloc[1500:]]
+    specs = [(part, "stacks", 1, sequence_method, group_by, "dat_envio") for part in parts]
+    results = score_jobs(ruleset, specs)
+
+    for part, result in zip(parts, results):
+        assert result["skills"] == list(ruleset.skills)
+        kwargs = {"sequence_method": sequence_method, "group_by": group_by}
+        if sequence_method and not group_by:
+            # Sequência única: a pilha segue a ordem enviada
+            kwargs["order_by"] = None
+        expected = _expected_stacks(part, ruleset, **kwargs)
+        assert np.array_equal(np.array(result["stacks"]), expected)
+
+
+def test_score_jobs_restores_the_order_sent_after_sorting(essays):
+    ruleset = load_ruleset()
+    part = essays.iloc[:500]
+    [result] = score_jobs(ruleset, [(part, "stacks", 1, True, "cod_usuario", "dat_envio")])
+    stacks = np.array(result["stacks"])
+
+    # A mesma simulação sobre as linhas já ordenadas, reposicionada à mão
+    ordered = part.sort_values(["cod_usuario", "dat_envio"], kind="stable")
+    [sorted_result] = score_jobs(ruleset, [(ordered, "stacks", 1, True, "cod_usuario", "dat_envio")])
+    position = pd.Series(np.arange(len(ordered)), index=ordered.index)
+    assert np.array_equal(stacks, np.array(sorted_result["stacks"])[position.loc[part.index].to_numpy()])
+
+
+def test_top_lists_only_skills_that_were_hit(essays):
+    ruleset = load_ruleset()
+    # Nenhuma regra se aplica a esta linha: a pilha fica zerada e o top vazio
+    untouched = pd.DataFrame([{"cod_condicional": 1}])
+    rows = essays.iloc[:300]
+    specs = [(untouched, "stacks", 1, False, None, "dat_envio"), (rows, "stacks", 1, False, None, "dat_envio")]
+    stacks = score_jobs(ruleset, specs)
+    tops = score_jobs(ruleset, [(df, "top", 3, *rest) for df, _, _, *rest in specs])
+
+    assert not any(stacks[0]["stacks"][0])
+    assert tops[0]["top"] == [[]]
+    for state, skills in zip(stacks[1]["stacks"], tops[1]["top"]):
+        stack = {skill: value for skill, value in zip(ruleset.skills, state) if value > 0}
+        # Mesma ordem e desempate que SkillStack.greater sobre as habilidades acionadas
+        assert skills == sorted(stack, key=lambda skill: -stack[skill])[:3]
@@ -0,0 +1,29 @@
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import utils.load_data
+from utils.synthetic_data import synthetic_essays
+
+
+def _same_essays_per_user(users=3, essays=3):
+    # Todos os usuários com as mesmas redações: trajetórias (e gráficos) idênticos
+    base = synthetic_essays(rows=essays, hit_rate=1.0, seed=7)
+    frames = []
+    for user in range(users):
+        frame = base.copy()
+        frame["cod_usuario"] = user + 1
+        frame["cod_correcao_redacao"] = range(user * essays + 1, (user + 1) * essays + 1)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_users_with_identical_trajectories(monkeypatch):
+    df = _same_essays_per_user()
+    monkeypatch.setattr(utils.load_data, "load_data", lambda *args, **kwargs: df)
+
+    at = AppTest.from_file("../pages/sequence_essays.py", default_timeout=60).run()
+
+    assert not at.exception
+    charts = at.get("plotly_chart")
+    assert len(charts) == df["cod_usuario"].nunique()
+    assert len({chart.proto.id for chart in charts}) == len(charts)
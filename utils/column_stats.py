@@ -0,0 +1,154 @@
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+from utils.fingerprint import known_fingerprint
+
+# Quantis guardados de cada coluna numérica
+QUANTILES = (0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0)
+TOP_N = 10
+
+# fingerprint (ou id do objeto) -> DatasetCatalog dos últimos conjuntos de dados usados
+_CATALOGS = OrderedDict()
+_CATALOGS_LOCK = threading.Lock()
+MAX_CATALOGS = 8
+
+
+@dataclass
+class ColumnStats:
+    dtype: str
+    numeric: bool
+    integer: bool
+    min: object
+    max: object
+    nulls: int
+    cardinality: int
+    top: list
+    quantiles: dict
+    values: object
+
+    @classmethod
+    def from_series(cls, series: pd.Series, top_n: int = TOP_N):
+        """
+        Computes the statistics of a column.
+
+        ``min``/``max`` are what ``series.min()``/``series.max()`` return and
+        ``values`` is ``series.unique()`` (distinct values in order of
+        appearance, nulls included), so they can replace those calls exactly.
+        ``top`` holds the ``top_n`` most frequent values as (value, count) pairs
+        and ``quantiles`` maps each of QUANTILES to its value (numeric columns
+        only, nulls ignored).
+        """
+        numeric = pd.api.types.is_numeric_dtype(series)
+        values = series.unique()
+        nulls = int(series.isna().sum())
+        counts = series.value_counts(dropna=False, sort=True).head(top_n)
+
+        quantiles = {}
+        if numeric and not pd.api.types.is_bool_dtype(series) and nulls < len(series):
+            quantiles = dict(zip(QUANTILES, series.quantile(list(QUANTILES)).tolist()))
+
+        return cls(
+            dtype=str(series.dtype),
+            numeric=numeric,
+            integer=pd.api.types.is_integer_dtype(series),
+            min=series.min() if numeric else None,
+            max=series.max() if numeric else None,
+            nulls=nulls,
+            cardinality=int(pd.notna(values).sum()),
+            top=list(zip(counts.index.tolist(), counts.tolist())),
+            quantiles=quantiles,
+            values=values,
+        )
+
+
+class DatasetCatalog:
+    """
+    The ColumnStats of a dataset's columns, each computed on first access
+    (``catalog[col]``), so a page only pays for the columns it filters.
+
+    The catalog keeps a weak reference to the frame it reads; ``column_catalog``
+    points it at the frame being used on every lookup.
+    """
+
+    def __init__(self, fingerprint, df: pd.DataFrame):
+        self.fingerprint = fingerprint
+        self.rows = len(df)
+        self.names = list(df.columns)
+        self.columns = {}
+        self._df = weakref.ref(df)
+
+    def attach(self, df: pd.DataFrame):
+        self._df = weakref.ref(df)
+
+    def __getitem__(self, col):
+        stats = self.columns.get(col)
+        if stats is None:
+            if col not in self.names:
+                raise KeyError(col)
+            df = self._df()
+            if df is None:
+                raise LookupError("O DataFrame do catálogo não existe mais; use column_catalog(df).")
+            # Duas sessões podem calcular a mesma coluna ao mesmo tempo: fica a primeira
+            stats = self.columns.setdefault(col, ColumnStats.from_series(df[col]))
+        return stats
+
+    def __contains__(self, col):
+        return col in self.names
+
+    def to_frame(self):
+        """
+        Returns one row per column with its scalar statistics (computing the
+        columns not accessed yet).
+        """
+        return pd.DataFrame(
+            {
+                col: {
+                    "dtype": stats.dtype,
+                    "minimo": stats.min,
+                    "maximo": stats.max,
+                    "nulos": stats.nulls,
+                    "cardinalidade": stats.cardinality,
+                    "mediana": stats.quantiles.get(0.5),
+                }
+                for col, stats in ((col, self[col]) for col in self.names)
+            }
+        ).T
+
+
+def column_catalog(df: pd.DataFrame):
+    """
+    Returns the statistics catalog of a DataFrame.
+
+    Frames whose fingerprint is already known without hashing (read through
+    the Arrow cache, or derived from such a frame, see ``utils.fingerprint``)
+    share one catalog per fingerprint, so equal data used again (another rerun,
+    page or session) reuses it. Any other frame gets a catalog of its own,
+    kept while it is the same object: hashing its values would cost as much
+    as the statistics themselves. The last MAX_CATALOGS catalogs are kept.
+
+    Params:
+    df : pd.DataFrame
+        The dataset.
+
+    Returns:
+    DatasetCatalog
+        The catalog, whose ColumnStats are computed on first access.
+    """
+    fingerprint = known_fingerprint(df)
+    key = fingerprint if fingerprint is not None else ("objeto", id(df))
+    # As sessões do Streamlit rodam em threads e compartilham os catálogos
+    with _CATALOGS_LOCK:
+        catalog = _CATALOGS.get(key)
+        if catalog is not None and (fingerprint is not None or catalog._df() is df):
+            _CATALOGS.move_to_end(key)
+        else:
+            catalog = _CATALOGS[key] = DatasetCatalog(fingerprint, df)
+            _CATALOGS.move_to_end(key)
+            while len(_CATALOGS) > MAX_CATALOGS:
+                _CATALOGS.popitem(last=False)
+        catalog.attach(df)
+    return catalog
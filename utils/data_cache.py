@@ -0,0 +1,135 @@
+"""
+Cache colunar (Arrow IPC / Feather v2) dos CSVs de redações.
+
+O CSV é convertido uma única vez para um arquivo Arrow sem compressão, identificado
+pelo caminho, tamanho e data de modificação do CSV; as leituras seguintes mapeiam
+esse arquivo em memória (mmap) em vez de interpretar o texto novamente. O cache fica
+em disco, é compartilhado entre páginas, sessões e processos, e pode ser aquecido
+pela linha de comando:
+
+    python -m utils.data_cache data/conteudo_adaptativoc2_dados_selecionados.csv
+"""
+import argparse
+import glob
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.fingerprint import set_fingerprint, source_fingerprint
+
+CACHE_DIR = os.environ.get("SKILLSTACK_CACHE_DIR", os.path.join(".cache", "data"))
+
+# (arquivo de cache, colunas) -> DataFrame já carregado neste processo
+_LOADED = OrderedDict()
+_LOADED_LOCK = threading.Lock()
+MAX_LOADED = 4
+
+
+def cache_path(path: str, optimize: bool = True):
+    # Arquivo de cache da versão atual do CSV
+    stat = os.stat(path)
+    source = os.path.abspath(path)
+    source_key = hashlib.sha1(source.encode()).hexdigest()[:12]
+    version_key = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    # Tipos otimizados ou não ficam em arquivos separados (a limpeza de um não apaga o outro)
+    mode = "opt" if optimize else "raw"
+    return os.path.join(CACHE_DIR, f"{stem}-{source_key}-{mode}-{version_key}.arrow")
+
+
+def warm_cache(path: str, optimize: bool = True):
+    # Converte o CSV para Arrow se o cache não existir (ou estiver desatualizado)
+    target = cache_path(path, optimize)
+    if os.path.exists(target):
+        return target
+
+    from pyarrow import feather
+
+    from utils.load_data import optimize_dtypes
+
+    df = pd.read_csv(path)
+    if optimize:
+        df = optimize_dtypes(df)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    feather.write_feather(df, tmp, compression="uncompressed")
+    os.replace(tmp, target)
+
+    # Remove versões antigas do mesmo CSV com a mesma opção de tipos
+    prefix = target.rsplit("-", 1)[0]
+    for old in glob.glob(f"{prefix}-*.arrow"):
+        if old != target:
+            os.remove(old)
+    return target
+
+
+def load_cached(path: str, columns=None, optimize: bool = True):
+    """
+    Loads a CSV through its Arrow cache, creating the cache on first use.
+
+    The cache file is memory-mapped and only the requested columns are read;
+    numeric columns without nulls are converted without copying when pyarrow
+    allows it. Loaded frames are also kept in memory, so the DataFrame
+    returned is shared and must not be modified in place.
+
+    Raises:
+    ImportError
+        If pyarrow is not installed.
+    """
+    from pyarrow import feather
+
+    start = time.perf_counter()
+    target = warm_cache(path, optimize)
+    key = (target, None if columns is None else frozenset(columns))
+    with _LOADED_LOCK:
+        if key in _LOADED:
+            # LRU: o conjunto usado por todas as páginas não é o primeiro a sair
+            _LOADED.move_to_end(key)
+            return _LOADED[key]
+
+    table = feather.read_table(target, memory_map=True)
+    total_columns = table.num_columns
+    if columns is not None:
+        table = table.select([col for col in table.column_names if col in set(columns)])
+    df = table.to_pandas(split_blocks=True)
+    # O arquivo de cache já identifica a versão dos dados: o catálogo de colunas e as
+    # chaves de cache não precisam percorrer os valores
+    set_fingerprint(df, source_fingerprint(target, list(df.columns)))
+
+    memory = int(df.memory_usage(deep=True).sum())
+    df.attrs["load_report"] = {
+        "columns_read": len(df.columns),
+        "columns_total": total_columns,
+        "memory_before": memory,
+        "memory_after": memory,
+        "seconds": time.perf_counter() - start,
+        "cache": target,
+    }
+    with _LOADED_LOCK:
+        # Se outra sessão carregou o mesmo arquivo ao mesmo tempo, todas usam o mesmo objeto
+        df = _LOADED.setdefault(key, df)
+        _LOADED.move_to_end(key)
+        while len(_LOADED) > MAX_LOADED:
+            _LOADED.popitem(last=False)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aquece o cache Arrow dos CSVs de redações.")
+    parser.add_argument("paths", nargs="+", help="CSVs a converter")
+    parser.add_argument("--no-optimize", action="store_true", help="Mantém os tipos padrão do pandas")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        start = time.perf_counter()
+        target = warm_cache(path, optimize=not args.no_optimize)
+        print(f"{path} -> {target} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
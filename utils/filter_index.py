@@ -0,0 +1,133 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# id(df) -> (weakref, FilterIndex); um índice por DataFrame carregado
+_INDEXES = {}
+
+
+class FilterIndex:
+    """
+    Per-column indexes of a DataFrame for the sidebar filters.
+
+    Range filters use the column's row positions sorted by value: the rows in
+    ``[low, high]`` are a slice found with two binary searches. Value filters
+    use the rows grouped by value (each distinct value owns a slice of
+    positions), so selecting values touches only their rows. Each filter
+    becomes a boolean row mask and a filter set is the AND of the masks;
+    filters that keep every row (the full range, or every value, which is what
+    an empty multiselect means) are skipped.
+
+    Indexes are built on the first filter of each column and reused afterwards.
+    The DataFrame must not be modified in place after being indexed.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        # Referência fraca: o índice não prende o DataFrame em memória
+        self._df = weakref.ref(df)
+        self.size = len(df)
+        self._ranges = {}
+        self._values = {}
+
+    @property
+    def df(self):
+        return self._df()
+
+    def mask(self, filters: dict):
+        """
+        Returns the boolean mask of the rows that pass every filter, or None if
+        every row passes.
+
+        Params:
+        filters : dict
+            Column -> ``(low, high)`` tuple (inclusive range, numeric columns
+            only) or collection of accepted values, as built by
+            ``filter_component``.
+        """
+        result = None
+        for col, criteria in filters.items():
+            if pd.api.types.is_numeric_dtype(self.df[col]) and isinstance(criteria, tuple):
+                col_mask = self._range_mask(col, criteria[0], criteria[1])
+            else:
+                col_mask = self._values_mask(col, criteria)
+            if col_mask is None:
+                continue
+            result = col_mask if result is None else np.logical_and(result, col_mask, out=result)
+        return result
+
+    def positions(self, filters: dict):
+        """
+        Returns the positions (ascending) of the rows that pass every filter.
+        """
+        mask = self.mask(filters)
+        return np.arange(self.size) if mask is None else np.flatnonzero(mask)
+
+    def _range_mask(self, col, low, high):
+        order, values = self._range_index(col)
+        start = np.searchsorted(values, low, side="left")
+        end = np.searchsorted(values, high, side="right")
+        if start == 0 and end == self.size:
+            return None
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:end]] = True
+        return mask
+
+    def _range_index(self, col):
+        index = self._ranges.get(col)
+        if index is None:
+            series = self.df[col]
+            values = series.to_numpy()
+            if values.dtype.kind not in "biuf":
+                # Tipos com NA do pandas (Int64, Float64...): nulos viram NaN
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            # Nulos ficam fora do índice: (col >= a) & (col <= b) é falso para eles
+            valid = np.flatnonzero(~pd.isna(values))
+            order = valid[np.argsort(values[valid], kind="stable")]
+            index = self._ranges[col] = (order, values[order])
+        return index
+
+    def _values_mask(self, col, criteria):
+        uniques, offsets, rows, null_rows = self._values_index(col)
+        values = pd.Index(list(criteria), dtype=object)
+        nulls = values.isna()
+        # get_indexer compara como isin (ex.: 1 e 1.0, datetime64 e Timestamp)
+        selected = np.unique(uniques.get_indexer(values[~nulls]))
+        selected = selected[selected >= 0]
+        matched_nulls = null_rows[:0]
+        if nulls.any() and len(null_rows):
+            # Como isin trata nulos depende do dtype (NaN, None, pd.NA); decide o próprio isin
+            matched_nulls = null_rows[self.df[col].iloc[null_rows].isin(criteria).to_numpy()]
+
+        if len(selected) == len(uniques) and len(matched_nulls) == len(null_rows):
+            return None
+        mask = np.zeros(self.size, dtype=bool)
+        for code in selected.tolist():
+            mask[rows[offsets[code]:offsets[code + 1]]] = True
+        mask[matched_nulls] = True
+        return mask
+
+    def _values_index(self, col):
+        index = self._values.get(col)
+        if index is None:
+            codes, uniques = pd.factorize(self.df[col], use_na_sentinel=True)
+            # Linhas agrupadas por valor: as do código c estão em rows[offsets[c]:offsets[c + 1]]
+            rows = np.argsort(codes, kind="stable")
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            null_count = len(codes) - counts.sum()
+            offsets = np.r_[0, np.cumsum(counts)] + null_count
+            index = self._values[col] = (pd.Index(uniques), offsets, rows, rows[:null_count])
+        return index
+
+
+def filter_index(df: pd.DataFrame):
+    """
+    Returns the FilterIndex of a DataFrame, creating it on first use. The index
+    lives as long as the DataFrame object.
+    """
+    memo = _INDEXES.get(id(df))
+    if memo is not None and memo[0]() is df:
+        return memo[1]
+    index = FilterIndex(df)
+    _INDEXES[id(df)] = (weakref.ref(df, lambda _, key=id(df): _INDEXES.pop(key, None)), index)
+    return index
@@ -0,0 +1,91 @@
+import hashlib
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# id(df) -> (weakref, fingerprint); evita recalcular para o mesmo objeto
+_MEMO = {}
+
+
+def dataset_fingerprint(df: pd.DataFrame):
+    """
+    Returns a hash of the DataFrame's columns, index and values.
+
+    Numeric, boolean and datetime columns are hashed from their raw buffers;
+    other columns through ``pd.util.hash_pandas_object``. The result is
+    memoized per DataFrame object, so frames must not be modified in place
+    after being fingerprinted.
+
+    Params:
+    df : pd.DataFrame
+        The dataset.
+
+    Returns:
+    str
+        A 32-character hex digest.
+    """
+    fingerprint = known_fingerprint(df)
+    if fingerprint is not None:
+        return fingerprint
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((list(df.columns), df.shape)).encode())
+    _update(digest, df.index)
+    for col in df.columns:
+        _update(digest, df[col])
+    fingerprint = digest.hexdigest()
+
+    set_fingerprint(df, fingerprint)
+    return fingerprint
+
+
+def set_fingerprint(df: pd.DataFrame, fingerprint: str):
+    """
+    Records the fingerprint of a DataFrame whose content is already identified
+    some other way (e.g. the versioned cache file it was read from), so
+    ``dataset_fingerprint`` returns it without hashing the values. Build it
+    with ``source_fingerprint``.
+    """
+    _MEMO[id(df)] = (weakref.ref(df, lambda _, key=id(df): _MEMO.pop(key, None)), fingerprint)
+
+
+def known_fingerprint(df: pd.DataFrame):
+    """
+    Returns the fingerprint of a DataFrame if it is already known (computed or
+    recorded for this object), otherwise None. Never hashes the values.
+    """
+    memo = _MEMO.get(id(df))
+    if memo is not None and memo[0]() is df:
+        return memo[1]
+    return None
+
+
+def source_fingerprint(*parts):
+    """
+    Returns a fingerprint built from ``repr``-able identifiers of the data
+    (file versions, parameters...) instead of from its values.
+    """
+    return hashlib.blake2b(repr(("fonte",) + parts).encode(), digest_size=16).hexdigest()
+
+
+def _update(digest, values):
+    dtype = values.dtype
+    digest.update(str(dtype).encode())
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        digest.update(np.ascontiguousarray(values.to_numpy()).view(np.uint8))
+    else:
+        digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().view(np.uint8))
+
+
+def row_set_hash(df: pd.DataFrame):
+    """
+    Returns a hash of the index labels of a DataFrame, in order.
+
+    For a subset of a dataset with a unique index (e.g. the rows left by the
+    filters), the labels identify the rows, so this plus the dataset
+    fingerprint identifies the subset without hashing its values.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _update(digest, df.index)
+    return digest.hexdigest()
@@ -1,13 +1,32 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 
+from utils.fingerprint import known_fingerprint, set_fingerprint, source_fingerprint
+
+# Colunas usadas pelas páginas além das lidas pelas regras
+PAGE_COLUMNS = ("cod_correcao_redacao", "cod_usuario", "dat_envio")
+
+# (id do DataFrame de origem, chave) -> (weakref da origem, DataFrame derivado)
+_DERIVED = OrderedDict()
+_DERIVED_LOCK = threading.Lock()
+MAX_DERIVED = 8
+
 def load_data(method='random', **kwargs):
     if method == 'random':
         return _create_example_dataframe()
     elif method == 'csv':
         return _load_from_csv(**kwargs)
+    elif method == 'synthetic':
+        from utils.synthetic_data import synthetic_essays
+
+        return synthetic_essays(**kwargs)
     else:
-        raise ValueError("Método inválido. Escolha 'random' ou 'csv'.")
+        raise ValueError("Método inválido. Escolha 'random', 'csv' ou 'synthetic'.")
 
 # Exemplo de DataFrame
 def _create_example_dataframe():
@@ -20,5 +39,143 @@ def _create_example_dataframe():
     }
     return pd.DataFrame(data)
 
-def _load_from_csv(path: str, **kwargs):
-    return pd.read_csv(path)
+def _load_from_csv(path: str, columns=None, optimize: bool = True, cache: bool = True, **kwargs):
+    # Com pyarrow disponível, lê do cache Arrow (mmap) em vez de interpretar o CSV
+    if cache:
+        try:
+            from utils.data_cache import load_cached
+
+            return load_cached(path, columns, optimize)
+        except ImportError:
+            pass
+
+    start = time.perf_counter()
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = None if columns is None else [col for col in header if col in set(columns)]
+    df = pd.read_csv(path, usecols=usecols)
+
+    memory_before = int(df.memory_usage(deep=True).sum())
+    if optimize:
+        df = optimize_dtypes(df)
+
+    df.attrs["load_report"] = {
+        "columns_read": len(df.columns),
+        "columns_total": len(header),
+        "memory_before": memory_before,
+        "memory_after": int(df.memory_usage(deep=True).sum()),
+        "seconds": time.perf_counter() - start,
+    }
+    return df
+
+def required_columns(ruleset=None, extra=PAGE_COLUMNS):
+    # Colunas lidas pelas regras mais as usadas pelas páginas
+    from skillStack.ruleset import load_ruleset
+
+    ruleset = ruleset or load_ruleset()
+    return set(ruleset.columns) | set(extra)
+
+def optimize_dtypes(df: pd.DataFrame, max_category_ratio: float = 0.5):
+    # Reduz cada coluna ao menor tipo que representa exatamente os mesmos valores
+    optimized = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            optimized[col] = series
+        elif pd.api.types.is_integer_dtype(series):
+            optimized[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            # float32 mudaria comparações com limites das regras (ex.: 0.1);
+            # só converte para inteiro quando não há nulos nem casas decimais
+            values = series.to_numpy()
+            if not series.isna().any() and np.array_equal(values, np.round(values)):
+                optimized[col] = pd.to_numeric(series.astype(np.int64), downcast="integer")
+            else:
+                optimized[col] = series
+        elif pd.api.types.is_object_dtype(series) and len(series):
+            if series.nunique(dropna=False) / len(series) <= max_category_ratio:
+                optimized[col] = series.astype("category")
+            else:
+                optimized[col] = series
+        else:
+            optimized[col] = series
+    return pd.DataFrame(optimized, index=df.index)
+
+def derived_frame(df: pd.DataFrame, key, build):
+    """
+    Returns ``build(df)``, memoized per source DataFrame object and ``key``.
+
+    Reruns that derive the same frame from the same loaded dataset (e.g. the
+    page's sample) get the same object back, so what is memoized per object
+    (filter indexes, fingerprints, column catalogs) is reused instead of being
+    rebuilt on every interaction. If the source's fingerprint is known (e.g. it
+    was read through the Arrow cache), the derived frame is fingerprinted from
+    it and ``key``. The last MAX_DERIVED frames are kept.
+
+    Params:
+    df : pd.DataFrame
+        The source frame, which must not be modified in place.
+    key : hashable
+        Identifies ``build`` and its parameters.
+    build : callable
+        A deterministic function of ``df``.
+    """
+    memo_key = (id(df), key)
+    # As sessões do Streamlit rodam em threads e compartilham o memo
+    with _DERIVED_LOCK:
+        memo = _DERIVED.get(memo_key)
+        if memo is not None and memo[0]() is df:
+            _DERIVED.move_to_end(memo_key)
+            return memo[1]
+
+    # Calculado fora do lock: outras sessões não esperam por ele
+    derived = build(df)
+    parent = known_fingerprint(df)
+    if parent is not None and derived is not df:
+        # Identificado pela origem e pela chave (ex.: amostra n, seed): sem percorrer os valores
+        set_fingerprint(derived, source_fingerprint(parent, key))
+
+    with _DERIVED_LOCK:
+        memo = _DERIVED.get(memo_key)
+        if memo is not None and memo[0]() is df:
+            # Outra sessão derivou o mesmo frame ao mesmo tempo: todas usam o primeiro
+            derived = memo[1]
+        else:
+            _DERIVED[memo_key] = (weakref.ref(df), derived)
+        _DERIVED.move_to_end(memo_key)
+        while len(_DERIVED) > MAX_DERIVED:
+            _DERIVED.popitem(last=False)
+    return derived
+
+def sample_data(df: pd.DataFrame, n: int, random_state: int = 0):
+    # Amostra fixa de n linhas, o mesmo objeto entre reruns (ValueError se n > len(df))
+    return derived_frame(df, ("sample", n, random_state), lambda source: source.sample(n, random_state=random_state))
+
+def describe_load(df: pd.DataFrame):
+    # Texto curto com o relatório de carregamento (colunas e memória economizada)
+    report = df.attrs.get("load_report")
+    if not report:
+        return ""
+    if report.get("cache"):
+        return (
+            f"{report['columns_read']}/{report['columns_total']} colunas, "
+            f"{report['memory_after'] / 2**20:.1f} MB, {report['seconds'] * 1000:.0f} ms (cache)"
+        )
+    saved = 1 - report["memory_after"] / max(report["memory_before"], 1)
+    return (
+        f"{report['columns_read']}/{report['columns_total']} colunas, "
+        f"{report['memory_after'] / 2**20:.1f} MB ({saved:.0%} a menos), "
+        f"{report['seconds']:.2f}s"
+    )
+
+def iter_chunks(path: str, chunksize: int = 100_000, columns=None):
+    # Lê o arquivo em blocos de até chunksize linhas (CSV ou Parquet)
+    if path.endswith(".csv"):
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        raise ValueError("Formato de arquivo não suportado. Use .csv ou .parquet")
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from skillStack.rule_engine import column_constants
+from skillStack.ruleset import RULES_FILE, load_ruleset
+
+
+def synthetic_essays(
+    rows: int = 10_000,
+    essays_per_user: float = 5,
+    hit_rate: float = 0.2,
+    rules_path: str = RULES_FILE,
+    seed: int = 42,
+):
+    """
+    Generates a synthetic essay table with the columns the rules read.
+
+    Each rule column gets, with probability ``hit_rate``, one of the constants
+    the rules compare it with (or a neighbour of it, so both sides of ``<``/``>=``
+    thresholds are exercised), and 0 otherwise.
+
+    Params:
+    rows : int, optional
+        The number of essays. Default is 10000.
+    essays_per_user : float, optional
+        The average number of essays of each ``cod_usuario``. Default is 5.
+    hit_rate : float, optional
+        The probability of a column holding a value the rules look at.
+        Default is 0.2.
+    rules_path : str, optional
+        The rules file the columns are taken from. Default is ``rules.json``.
+    seed : int, optional
+        The random seed. Default is 42.
+
+    Returns:
+    pd.DataFrame
+        The essays, with ``cod_correcao_redacao``, ``cod_usuario`` and
+        ``dat_envio`` besides the rule columns.
+    """
+    rng = np.random.default_rng(seed)
+    ruleset = load_ruleset(rules_path)
+
+    constants = {}
+    for rule in ruleset.rules:
+        for column, values in column_constants(rule.get("fonte")).items():
+            constants.setdefault(column, set()).update(values)
+
+    data = {}
+    for column in sorted(ruleset.columns):
+        values = constants.get(column, set())
+        numbers = sorted(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+        if numbers:
+            integers = all(float(v).is_integer() for v in numbers)
+            triggers = sorted(set(numbers) | {v + 1 for v in numbers} | {max(v - 1, 0) for v in numbers})
+            column_values = np.zeros(rows, dtype=np.int64 if integers else np.float64)
+        elif values:
+            triggers = sorted(values, key=str)
+            column_values = np.full(rows, "", dtype=object)
+        else:
+            triggers = [1]
+            column_values = np.zeros(rows, dtype=np.int64)
+
+        hits = rng.random(rows) < hit_rate
+        column_values[hits] = rng.choice(np.array(triggers, dtype=column_values.dtype), hits.sum())
+        data[column] = column_values
+
+    users = max(int(round(rows / essays_per_user)), 1)
+    data["cod_correcao_redacao"] = np.arange(rows)
+    data["cod_usuario"] = rng.integers(0, users, rows)
+    sent = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, rows), unit="s")
+    data["dat_envio"] = sent.strftime("%Y-%m-%d %H:%M:%S")
+    return pd.DataFrame(data)